@@ -0,0 +1 @@
+"""Offline load tests that drive the cogs with fake Discord objects"""
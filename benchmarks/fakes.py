@@ -0,0 +1,120 @@
+import itertools
+import discord
+
+_ids = itertools.count(10**17)
+
+def next_id():
+    return next(_ids)
+
+class FakeAsset:
+    """Stands in for discord.Asset where only the URL is read"""
+    
+    def __init__(self, url):
+        self.url = url
+
+class FakeUser:
+    """The bot's own user, which the command dispatcher compares authors against"""
+    
+    def __init__(self, name='bench-bot'):
+        self.id = next_id()
+        self.name = name
+        self.bot = True
+        self.mention = f'<@{self.id}>'
+        self.display_avatar = FakeAsset(f'https://cdn.example/avatars/{self.id}.png')
+    
+    def __str__(self):
+        return self.name
+
+class FakeChannel:
+    """Text channel that records sends instead of calling the API"""
+    
+    def __init__(self, guild, name='general'):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.mention = f'<#{self.id}>'
+        self.type = discord.ChannelType.text
+        self.sent = 0
+    
+    def permissions_for(self, member):
+        return discord.Permissions.all()
+    
+    async def send(self, content=None, **kwargs):
+        self.sent += 1
+        return FakeMessage(content or '', self.guild.me, self)
+
+class FakeMember:
+    """Guild member with the attributes the cogs read"""
+    
+    def __init__(self, guild, bot=False):
+        self.id = next_id()
+        self.guild = guild
+        self.bot = bot
+        self.name = f'user{self.id % 100000}'
+        self.display_name = self.name
+        self.nick = None
+        self.mention = f'<@{self.id}>'
+        self.display_avatar = FakeAsset(f'https://cdn.example/avatars/{self.id}.png')
+        self.roles = []
+        self.guild_permissions = discord.Permissions.all()
+    
+    def __str__(self):
+        return self.name
+    
+    async def add_roles(self, *roles, reason=None):
+        self.roles.extend(roles)
+
+class FakeGuild:
+    """Guild holding fake members and a single text channel"""
+    
+    def __init__(self, members=100, name=None):
+        self.id = next_id()
+        self.name = name or f'guild{self.id % 1000}'
+        self.icon = None
+        self.me = FakeMember(self, bot=True)
+        self._members = {self.me.id: self.me}
+        for _ in range(members):
+            member = FakeMember(self)
+            self._members[member.id] = member
+        self.channel = FakeChannel(self)
+        self.channels = [self.channel]
+        self.owner = self.me
+        self.roles = []
+        self.chunked = True
+    
+    @property
+    def members(self):
+        return list(self._members.values())
+    
+    @property
+    def member_count(self):
+        return len(self._members)
+    
+    def get_member(self, user_id):
+        return self._members.get(user_id)
+    
+    async def chunk(self, *, cache=True):
+        return self.members
+    
+    def get_channel(self, channel_id):
+        return self.channel if channel_id == self.channel.id else None
+    
+    def get_role(self, role_id):
+        return None
+    
+    def humans(self):
+        return [member for member in self._members.values() if not member.bot]
+
+class FakeMessage:
+    """Message with just enough surface for listeners and the command parser"""
+    
+    def __init__(self, content, author, channel):
+        self.id = next_id()
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.attachments = []
+        self.embeds = []
+        self.mentions = []
+        self._state = None
@@ -0,0 +1,271 @@
+"""Drive the message and XP path with fake Discord objects and report latency
+
+Usage:
+    python -m benchmarks.load_test --rate 500 --duration 10 --guilds 5 --members 2000
+
+Runs entirely offline against a temporary SQLite file. Every generated
+message goes through the registered on_message listeners (Levels.on_message
+included), and a share of them are commands run through the normal command
+dispatcher with the same global check, limiter and invoke hooks as bot.py.
+Commands that fail are counted per command and error type.
+"""
+import argparse
+import asyncio
+import collections
+import datetime
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+from discord.ext import commands
+from benchmarks.fakes import FakeGuild, FakeMessage, FakeUser
+from utils.cluster import ClusterStats
+from utils.database import Database
+from utils.health import HealthSampler
+from utils.metrics import Metrics
+from utils.migrations import run_migrations
+from utils.outbox import Outbox
+from utils.ratelimit import CommandLimiter, RateLimited, parse_limits, parse_rate
+from utils.settings import GuildSettingsCache
+
+class CountingDatabase(Database):
+    """Database that counts every statement the cogs issue"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ops = 0
+    
+    async def fetchone(self, query, params=()):
+        self.ops += 1
+        return await super().fetchone(query, params)
+    
+    async def fetchall(self, query, params=()):
+        self.ops += 1
+        return await super().fetchall(query, params)
+    
+    async def execute(self, query, params=()):
+        self.ops += 1
+        return await super().execute(query, params)
+    
+    async def executemany(self, query, rows):
+        self.ops += 1
+        return await super().executemany(query, rows)
+
+class BenchBot(commands.Bot):
+    """Bot that never connects, so it has no heartbeat to measure latency from"""
+    
+    @property
+    def latency(self):
+        return 0.0
+
+class BenchContext(commands.Context):
+    """Context whose replies go to the fake channel instead of the HTTP client"""
+    
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def build_bot(db_path, extensions, prefix):
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.members = True
+    
+    def get_prefix(bot, message):
+        if message.guild is None:
+            return bot.settings.default_prefix
+        return bot.settings.prefix(message.guild.id)
+    
+    bot = BenchBot(command_prefix=get_prefix, intents=intents)
+    bot.remove_command('help')
+    bot.db = CountingDatabase(db_path)
+    bot.settings = GuildSettingsCache(bot.db, prefix)
+    bot.startup_report = {}
+    bot.start_time = datetime.datetime.now()
+    bot.cluster = ClusterStats(bot)
+    bot.outbox = Outbox()
+    bot.health = HealthSampler(bot, interval=float(os.getenv('HEALTH_INTERVAL', 5)))
+    # Same limits as bot.py, so refusals and their cost show up in the run
+    bot.limiter = CommandLimiter(
+        user_rate=parse_rate(os.getenv('USER_RATE_LIMIT', '5/10')),
+        guild_rate=parse_rate(os.getenv('GUILD_RATE_LIMIT', '60/10')),
+        command_rates=parse_limits(os.getenv('COMMAND_RATE_LIMITS', 'leaderboard=3/15,serverinfo=3/15,poll=2/30,trivia=2/20')),
+        concurrency=parse_limits(os.getenv('COMMAND_CONCURRENCY', 'trivia=1,guess=2,leaderboard=2'), int)
+    )
+    bot.metrics = Metrics()
+    
+    @bot.check
+    async def rate_limit(ctx):
+        return bot.limiter.check(ctx)
+    
+    @bot.before_invoke
+    async def before_command(ctx):
+        bot.limiter.acquire(ctx)
+        bot.metrics.command_started(ctx)
+    
+    @bot.after_invoke
+    async def after_command(ctx):
+        bot.limiter.release(ctx)
+        bot.metrics.command_finished(ctx, error=ctx.command_failed)
+    
+    # No gateway login happens: bind the client to this loop the way login() would,
+    # and give the connection state a user to compare message authors against
+    await bot._async_setup_hook()
+    bot._connection.user = FakeUser()
+    
+    await bot.db.connect()
+    await run_migrations(bot.db)
+    await bot.settings.load()
+    for extension in extensions:
+        await bot.load_extension(extension)
+    bot.cluster.start()
+    bot.health.start()
+    return bot
+
+async def run(args):
+    db_path = args.database or os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.db')
+    os.environ['DATABASE_PATH'] = db_path
+    
+    bot = await build_bot(db_path, args.extensions.split(','), args.prefix)
+    guilds = [FakeGuild(members=args.members) for _ in range(args.guilds)]
+    command_names = [name for name in args.commands.split(',') if name]
+    listeners = bot.extra_events.get('on_message', [])
+    
+    latencies = {'listener': [], 'command': []}
+    errors = 0
+    rate_limited = 0
+    failures = collections.defaultdict(collections.Counter)   # command -> error type -> count
+    peak_tasks = 0
+    messages = 0
+    start_ops = bot.db.ops
+    
+    # bot.invoke hands command errors to on_command_error instead of raising them
+    async def on_command_error(ctx, error):
+        nonlocal errors, rate_limited
+        if isinstance(error, RateLimited):
+            rate_limited += 1
+            return
+        errors += 1
+        original = getattr(error, 'original', error)
+        failures[ctx.invoked_with or '?'][type(original).__name__] += 1
+        if args.verbose:
+            print(f'Command error in {ctx.invoked_with}: {original!r}')
+    
+    bot.add_listener(on_command_error)
+    
+    async def handle(message, is_command):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            for listener in listeners:
+                await listener(message)
+            latencies['listener'].append(time.perf_counter() - started)
+            
+            if is_command:
+                started = time.perf_counter()
+                ctx = await bot.get_context(message, cls=BenchContext)
+                await bot.invoke(ctx)
+                latencies['command'].append(time.perf_counter() - started)
+        except Exception as e:
+            errors += 1
+            if args.verbose:
+                print(f'Handler error: {e!r}')
+    
+    async def sample_tasks():
+        nonlocal peak_tasks
+        while True:
+            peak_tasks = max(peak_tasks, len(asyncio.all_tasks()))
+            await asyncio.sleep(0.01)
+    
+    sampler = asyncio.create_task(sample_tasks())
+    in_flight = set()
+    interval = 1 / args.rate
+    began = time.perf_counter()
+    deadline = began + args.duration
+    next_at = began
+    
+    # Open-loop generator: messages arrive on schedule whether or not earlier ones finished
+    while time.perf_counter() < deadline:
+        guild = random.choice(guilds)
+        author = random.choice(guild.humans())
+        is_command = bool(command_names) and random.random() < args.command_ratio
+        content = f'{args.prefix}{random.choice(command_names)}' if is_command else 'hello world'
+        
+        task = asyncio.create_task(handle(FakeMessage(content, author, guild.channel), is_command))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+        messages += 1
+        
+        next_at += interval
+        delay = next_at - time.perf_counter()
+        await asyncio.sleep(max(0, delay))
+    
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    elapsed = time.perf_counter() - began
+    sampler.cancel()
+    await asyncio.sleep(0)   # let the last error events run
+    
+    await bot.health.close()
+    await bot.cluster.close()
+    
+    # Unloading flushes buffered writes, which belong to this run's database cost
+    for extension in list(bot.extensions):
+        await bot.unload_extension(extension)
+    db_ops = bot.db.ops - start_ops
+    await bot.db.close()
+    
+    report = {
+        'messages': messages,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_msg_s': round(messages / elapsed, 1),
+        'listener_p50_ms': round(percentile(latencies['listener'], 50) * 1000, 3),
+        'listener_p99_ms': round(percentile(latencies['listener'], 99) * 1000, 3),
+        'commands': len(latencies['command']),
+        'command_p50_ms': round(percentile(latencies['command'], 50) * 1000, 3),
+        'command_p99_ms': round(percentile(latencies['command'], 99) * 1000, 3),
+        'db_ops': db_ops,
+        'db_ops_per_message': round(db_ops / max(messages, 1), 4),
+        'peak_tasks': peak_tasks,
+        'rate_limited': rate_limited,
+        'errors': errors,
+        'failures': {name: dict(counts) for name, counts in sorted(failures.items())},
+    }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline load test for the message and XP path')
+    parser.add_argument('--rate', type=float, default=200, help='messages per second')
+    parser.add_argument('--duration', type=float, default=10, help='seconds to generate load')
+    parser.add_argument('--guilds', type=int, default=3)
+    parser.add_argument('--members', type=int, default=500, help='members per guild')
+    parser.add_argument('--command-ratio', type=float, default=0.05, help='share of messages that are commands')
+    parser.add_argument('--commands', default='rank,leaderboard,ping', help='comma-separated commands to invoke')
+    parser.add_argument('--extensions', default='cogs.levels,cogs.general', help='comma-separated extensions to load')
+    parser.add_argument('--prefix', default='!')
+    parser.add_argument('--database', help='SQLite file to use (defaults to a temporary file)')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    parser.add_argument('--verbose', action='store_true', help='print handler errors')
+    args = parser.parse_args()
+    
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report))
+    else:
+        width = max(len(key) for key in report)
+        for key, value in report.items():
+            print(f'{key:<{width}}  {value}')
+
+if __name__ == '__main__':
+    main()
@@ -2,31 +2,152 @@ import discord
 from discord.ext import commands
 import os
 from dotenv import load_dotenv
-import aiosqlite
+import asyncio
 import datetime
+import logging
+import signal
+import time
+from utils.cache_policy import cache_options
+from utils.cluster import ClusterStats
+from utils.database import Database
+from utils.health import HealthSampler
+from utils.log import command_context, setup_logging
+from utils.metrics import Metrics, MetricsServer
+from utils.migrations import run_migrations
+from utils.outbox import Outbox
+from utils.polls import PollManager
+from utils.presence import PresenceManager
+from utils.ratelimit import CommandLimiter, RateLimited, parse_limits, parse_rate
+from utils.reminders import ReminderScheduler
+from utils.settings import GuildSettingsCache
+
+PROCESS_STARTED = time.perf_counter()
 
 # Load environment variables
 load_dotenv()
+LOG_FILE = os.getenv('LOG_FILE')
+if LOG_FILE and os.getenv('CLUSTER_ID'):
+    # Clusters rotating one shared file would clobber each other, so each writes its own
+    root, extension = os.path.splitext(LOG_FILE)
+    LOG_FILE = f"{root}.cluster{os.getenv('CLUSTER_ID')}{extension}"
+setup_logging(LOG_FILE, os.getenv('LOG_LEVEL', 'INFO').upper())
+log = logging.getLogger('bot')
 
 # Database initialization
 async def init_db():
-    async with aiosqlite.connect(os.getenv('DATABASE_PATH')) as db:
-        # Create tables for various features
-        await db.execute('CREATE TABLE IF NOT EXISTS example (id INTEGER PRIMARY KEY)')
-        await db.commit()
+    await bot.db.connect()
+    applied = await run_migrations(bot.db)
+    if applied:
+        print(f'Applied database migrations: {", ".join(map(str, applied))}')
+    await bot.settings.load()
+    await bot.reminders.load()
+    await bot.polls.load()
 
 # Discord bot setup
 intents = discord.Intents.default()
 intents.message_content = True  # Required for reading message content
 intents.members = True  # Required for member events
-bot = commands.Bot(command_prefix=os.getenv('PREFIX'), intents=intents)
+
+def get_prefix(bot, message):
+    """Resolve the per-server prefix from the settings cache"""
+    if message.guild is None:
+        return bot.settings.default_prefix
+    return bot.settings.prefix(message.guild.id)
+
+class ExtensionEvents:
+    """Dispatches on_extensions_changed after an extension is loaded, unloaded or reloaded"""
+    
+    async def load_extension(self, name, *, package=None):
+        await super().load_extension(name, package=package)
+        self.dispatch('extensions_changed')
+    
+    async def unload_extension(self, name, *, package=None):
+        await super().unload_extension(name, package=package)
+        self.dispatch('extensions_changed')
+    
+    async def reload_extension(self, name, *, package=None):
+        await super().reload_extension(name, package=package)
+        self.dispatch('extensions_changed')
+
+class GracefulShutdown:
+    """Stops background services and flushes pending writes before the bot disconnects"""
+    
+    _shutting_down = False
+    
+    async def close(self):
+        if not self._shutting_down:
+            self._shutting_down = True
+            # Poll votes and the cluster row still need the database, and cogs flush their buffers on unload
+            for service in (self.presence, self.health, self.reminders, self.polls, self.cluster, self.metrics_server):
+                if service is None:
+                    continue
+                try:
+                    await service.close()
+                except Exception:
+                    log.exception('Failed to stop %s', type(service).__name__)
+        await super().close()
+        await self.outbox.close()
+        await self.db.close()
+
+class Bot(GracefulShutdown, ExtensionEvents, commands.Bot):
+    pass
+
+class AutoShardedBot(GracefulShutdown, ExtensionEvents, commands.AutoShardedBot):
+    pass
+
+# Sharding: SHARD_COUNT/SHARD_IDS are set by cluster.py for each worker process,
+# AUTO_SHARD=true lets a single process run every shard Discord recommends
+shard_count = int(os.getenv('SHARD_COUNT')) if os.getenv('SHARD_COUNT') else None
+shard_ids = [int(shard) for shard in os.getenv('SHARD_IDS').split(',')] if os.getenv('SHARD_IDS') else None
+
+if shard_count or os.getenv('AUTO_SHARD', '').lower() == 'true':
+    bot = AutoShardedBot(
+        command_prefix=get_prefix,
+        intents=intents,
+        shard_count=shard_count,
+        shard_ids=shard_ids,
+        **cache_options(intents)
+    )
+else:
+    bot = Bot(command_prefix=get_prefix, intents=intents, **cache_options(intents))
 bot.remove_command('help')  # Remove default help command to use custom one
+bot.db = Database(os.getenv('DATABASE_PATH'), readers=int(os.getenv('DATABASE_READERS', 3)))
+bot.settings = GuildSettingsCache(bot.db, os.getenv('PREFIX'))
+bot.startup_report = {}
+bot.cluster = ClusterStats(bot, cluster_id=os.getenv('CLUSTER_ID'))
+bot.outbox = Outbox()
+bot.reminders = ReminderScheduler(bot)
+bot.polls = PollManager(bot)
+bot.health = HealthSampler(
+    bot,
+    interval=float(os.getenv('HEALTH_INTERVAL', 5)),
+    size=int(os.getenv('HEALTH_SAMPLES', 720))
+)
+bot.presence = PresenceManager(
+    bot,
+    templates=os.getenv('PRESENCE_TEMPLATES', '{prefix}help | {guilds} servers').split(';'),
+    prefix=os.getenv('PREFIX'),
+    rotate_interval=float(os.getenv('PRESENCE_ROTATE_INTERVAL', 60))
+)
+bot.limiter = CommandLimiter(
+    user_rate=parse_rate(os.getenv('USER_RATE_LIMIT', '5/10')),
+    guild_rate=parse_rate(os.getenv('GUILD_RATE_LIMIT', '60/10')),
+    command_rates=parse_limits(os.getenv('COMMAND_RATE_LIMITS', 'leaderboard=3/15,serverinfo=3/15,poll=2/30,trivia=2/20')),
+    concurrency=parse_limits(os.getenv('COMMAND_CONCURRENCY', 'trivia=1,guess=2,leaderboard=2'), int)
+)
+bot.metrics_server = None
+bot.metrics = Metrics(labels={'cluster': bot.cluster.cluster_id} if bot.cluster.clustered else None)
 
 # Error handling
 @bot.event
 async def on_command_error(ctx, error):
     if isinstance(error, commands.CommandNotFound):
         return
+    elif isinstance(error, RateLimited):
+        if error.notify:
+            await ctx.send(f"⏳ Slow down! Try again in {error.retry_after:.0f}s", delete_after=min(error.retry_after, 10))
+    elif isinstance(error, commands.MaxConcurrencyReached):
+        await ctx.send(f"⏳ `{ctx.command}` is already running here, please wait for it to finish", delete_after=10)
     elif isinstance(error, commands.MissingPermissions):
         await ctx.send("❌ You don't have permission to use this command!")
     elif isinstance(error, commands.MissingRequiredArgument):
@@ -35,13 +156,85 @@ async def on_command_error(ctx, error):
         await ctx.send("❌ Invalid argument provided!")
     else:
         # Handle other errors
-        print(f'Error: {error}')
+        original = getattr(error, 'original', error)
+        log.error('Command failed: %s', original, exc_info=original, extra=command_context(ctx))
 
 # Load cogs
+async def load_extension_timed(name):
+    started = time.perf_counter()
+    try:
+        await bot.load_extension(name)
+    except Exception as e:
+        log.exception('Failed to load %s: %s', name, e)
+        return name, None
+    return name, time.perf_counter() - started
+
 async def load_cogs():
-    for filename in os.listdir('./cogs'):
-        if filename.endswith('.py'):
-            await bot.load_extension(f'cogs.{filename[:-3]}')
+    # Cogs don't depend on each other, so their setup (and cog_load) can overlap
+    names = sorted(f'cogs.{filename[:-3]}' for filename in os.listdir('./cogs') if filename.endswith('.py'))
+    return dict(await asyncio.gather(*(load_extension_timed(name) for name in names)))
+
+@bot.event
+async def setup_hook():
+    # Runs once before connecting to the gateway, unlike on_ready which fires on every reconnect
+    started = time.perf_counter()
+    await init_db()
+    db_time = time.perf_counter() - started
+    
+    timings = await load_cogs()
+    bot.cluster.start()
+    bot.health.start()
+    bot.presence.start()
+    bot.reminders.start()
+    bot.polls.start()
+    if os.getenv('METRICS_PORT'):
+        # Each cluster serves its own endpoint, so cluster N listens on METRICS_PORT + N
+        port = int(os.getenv('METRICS_PORT')) + (int(bot.cluster.cluster_id) if bot.cluster.clustered else 0)
+        bot.metrics_server = MetricsServer(bot.metrics, port=port)
+        try:
+            await bot.metrics_server.start()
+        except OSError as e:
+            bot.metrics_server = None
+            log.warning('Failed to start metrics endpoint on port %s: %s', port, e)
+    
+    # cluster.py stops workers with SIGTERM; close cleanly instead of dying mid-flush
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(bot.close()))
+    except NotImplementedError:
+        pass  # Windows event loops have no signal handlers
+    
+    bot.startup_report = {
+        'database': db_time,
+        'extensions': timings,
+        'total': time.perf_counter() - started,
+    }
+    print(f'Database ready in {db_time * 1000:.0f}ms')
+    for name, seconds in sorted(timings.items(), key=lambda item: -(item[1] or 0)):
+        print(f'  {name:<20} {"failed" if seconds is None else f"{seconds * 1000:.0f}ms"}')
+    print(f'Setup finished in {bot.startup_report["total"] * 1000:.0f}ms')
+
+@bot.event
+async def on_command(ctx):
+    # Time from process start to the first command handled, to measure deploy recovery
+    if bot.startup_report.get('first_command') is None:
+        bot.startup_report['first_command'] = time.perf_counter() - PROCESS_STARTED
+        print(f'First command after {bot.startup_report["first_command"]:.1f}s')
+
+# Rate limits are checked before arguments are converted, so refused commands cost almost nothing
+@bot.check
+async def rate_limit(ctx):
+    return bot.limiter.check(ctx)
+
+# Concurrency caps and timing: hooks run inline around every command callback, including ones that raise
+@bot.before_invoke
+async def before_command(ctx):
+    bot.limiter.acquire(ctx)
+    bot.metrics.command_started(ctx)
+
+@bot.after_invoke
+async def after_command(ctx):
+    bot.limiter.release(ctx)
+    bot.metrics.command_finished(ctx, error=ctx.command_failed)
 
 @bot.event
 async def on_ready():
@@ -50,22 +243,24 @@ async def on_ready():
     print(f'Discord.py Version: {discord.__version__}')
     print('------')
     
-    # Store start time for uptime command
-    bot.start_time = datetime.datetime.now()
-    
-    await init_db()
-    await load_cogs()
+    # Store start time for uptime command (kept across gateway reconnects)
+    if not hasattr(bot, 'start_time'):
+        bot.start_time = datetime.datetime.now()
+        bot.startup_report['ready'] = time.perf_counter() - PROCESS_STARTED
     
-    # Set bot status
-    await bot.change_presence(
-        activity=discord.Activity(
-            type=discord.ActivityType.watching,
-            name=f"{os.getenv('PREFIX')}help | {len(bot.guilds)} servers"
-        )
-    )
+    # Guild count may have drifted while disconnected
+    bot.presence.set_guild_count(len(bot.guilds))
     
     print(f'Bot is ready! Loaded {len(bot.cogs)} cogs with {len(list(bot.commands))} commands')
     print('------')
 
-# Run the bot
-bot.run(os.getenv('DISCORD_TOKEN'))
\ No newline at end of file
+@bot.event
+async def on_guild_join(guild):
+    bot.presence.guild_joined()
+
+@bot.event
+async def on_guild_remove(guild):
+    bot.presence.guild_removed()
+
+# Run the bot (logging is already routed through setup_logging)
+bot.run(os.getenv('DISCORD_TOKEN'), log_handler=None)
\ No newline at end of file
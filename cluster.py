@@ -0,0 +1,131 @@
+"""Run the bot as several sharded worker processes
+
+Usage:
+    python cluster.py [--clusters 4] [--shards 16]
+
+Each cluster is a separate `python bot.py` process that runs an
+AutoShardedBot over its own contiguous range of shard IDs. The supervisor
+restarts any cluster that exits, backing off if it keeps crashing, and stops
+every cluster on Ctrl+C or SIGTERM. Clusters publish their stats to the
+shared database, which is what !stats and !botinfo report.
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from dotenv import load_dotenv
+
+BOT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bot.py')
+
+def recommended_shards(token):
+    """Ask Discord how many shards the bot should run"""
+    request = urllib.request.Request(
+        'https://discord.com/api/v10/gateway/bot',
+        headers={'Authorization': f'Bot {token}', 'User-Agent': 'DiscordBot (cluster launcher, 1.0)'}
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)['shards']
+
+def split_shards(shard_count, clusters):
+    """Split shard IDs into `clusters` contiguous, near-equal ranges"""
+    clusters = max(1, min(clusters, shard_count))
+    size, extra = divmod(shard_count, clusters)
+    ranges = []
+    start = 0
+    for index in range(clusters):
+        end = start + size + (1 if index < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+class Cluster:
+    """One worker process and its restart bookkeeping"""
+    
+    def __init__(self, cluster_id, shard_ids, shard_count):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.process = None
+        self.started_at = 0.0
+        self.failures = 0
+        self.restart_at = 0.0
+    
+    def start(self):
+        env = dict(os.environ)
+        env['CLUSTER_ID'] = str(self.cluster_id)
+        env['SHARD_COUNT'] = str(self.shard_count)
+        env['SHARD_IDS'] = ','.join(map(str, self.shard_ids))
+        self.process = subprocess.Popen([sys.executable, BOT_SCRIPT], env=env)
+        self.started_at = time.monotonic()
+        print(f'[cluster {self.cluster_id}] started pid {self.process.pid} for shards {self.shard_ids[0]}-{self.shard_ids[-1]}')
+    
+    def stop(self, timeout=15):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+def supervise(clusters, max_backoff=300):
+    stopping = False
+    
+    def request_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+    
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    
+    for cluster in clusters:
+        cluster.start()
+        # Stagger identifies so clusters don't all hit the gateway at once
+        time.sleep(5)
+    
+    while not stopping:
+        now = time.monotonic()
+        for cluster in clusters:
+            if cluster.process is None:
+                if now >= cluster.restart_at:
+                    cluster.start()
+                continue
+            
+            code = cluster.process.poll()
+            if code is None:
+                continue
+            
+            # A cluster that ran for a while before dying gets a fresh backoff
+            if now - cluster.started_at > 60:
+                cluster.failures = 0
+            cluster.failures += 1
+            delay = min(max_backoff, 2 ** cluster.failures)
+            print(f'[cluster {cluster.cluster_id}] exited with code {code}, restarting in {delay}s')
+            cluster.process = None
+            cluster.restart_at = now + delay
+        time.sleep(1)
+    
+    print('Stopping clusters...')
+    for cluster in clusters:
+        cluster.stop()
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description='Run the bot as several sharded processes')
+    parser.add_argument('--clusters', type=int, default=int(os.getenv('CLUSTERS', os.cpu_count() or 1)))
+    parser.add_argument('--shards', type=int, default=int(os.getenv('SHARD_COUNT', 0)) or None,
+                        help='total shard count (defaults to the number Discord recommends)')
+    args = parser.parse_args()
+    
+    shard_count = args.shards or recommended_shards(os.getenv('DISCORD_TOKEN'))
+    ranges = split_shards(shard_count, args.clusters)
+    print(f'Running {shard_count} shards across {len(ranges)} clusters')
+    
+    clusters = [Cluster(index, shard_ids, shard_count) for index, shard_ids in enumerate(ranges)]
+    supervise(clusters)
+
+if __name__ == '__main__':
+    main()
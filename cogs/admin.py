@@ -1,39 +1,38 @@
 import discord
 from discord.ext import commands
-import aiosqlite
+import logging
 import os
+import time
+from utils.cache_policy import guild_memory_report
+from utils.hot_reload import reload_with_state
+from utils.join_pipeline import JoinPipeline
+from utils.log import command_context
+from utils.metrics import timed
+
+log = logging.getLogger(__name__)
 
 class Admin(commands.Cog):
     """Administrative commands for server configuration"""
     
     def __init__(self, bot):
         self.bot = bot
+        self.joins = JoinPipeline(
+            bot,
+            window=float(os.getenv('JOIN_WELCOME_WINDOW', 3)),
+            workers=int(os.getenv('JOIN_ROLE_WORKERS', 2))
+        )
     
-    async def init_db(self):
-        """Initialize the admin database"""
-        async with aiosqlite.connect(os.getenv('DATABASE_PATH')) as db:
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS guild_settings (
-                    guild_id INTEGER PRIMARY KEY,
-                    prefix TEXT DEFAULT NULL,
-                    welcome_channel_id INTEGER DEFAULT NULL,
-                    welcome_message TEXT DEFAULT NULL,
-                    leave_message TEXT DEFAULT NULL,
-                    autorole_id INTEGER DEFAULT NULL
-                )
-            ''')
-            await db.commit()
+    async def cog_load(self):
+        self.joins.start()
+    
+    async def cog_unload(self):
+        await self.joins.close()
     
     @commands.command(name='setprefix')
     @commands.has_permissions(administrator=True)
     async def set_prefix(self, ctx, prefix: str):
         """Set a custom prefix for this server"""
-        async with aiosqlite.connect(os.getenv('DATABASE_PATH')) as db:
-            await db.execute(
-                'INSERT OR REPLACE INTO guild_settings (guild_id, prefix) VALUES (?, ?)',
-                (ctx.guild.id, prefix)
-            )
-            await db.commit()
+        await self.bot.settings.update(ctx.guild.id, prefix=prefix)
         
         embed = discord.Embed(
             title="✅ Prefix Updated",
@@ -46,12 +45,7 @@ class Admin(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def set_welcome(self, ctx, channel: discord.TextChannel, *, message: str):
         """Set welcome message for new members"""
-        async with aiosqlite.connect(os.getenv('DATABASE_PATH')) as db:
-            await db.execute(
-                'INSERT OR REPLACE INTO guild_settings (guild_id, welcome_channel_id, welcome_message) VALUES (?, ?, ?)',
-                (ctx.guild.id, channel.id, message)
-            )
-            await db.commit()
+        await self.bot.settings.update(ctx.guild.id, welcome_channel_id=channel.id, welcome_message=message)
         
         embed = discord.Embed(
             title="✅ Welcome Message Set",
@@ -66,12 +60,7 @@ class Admin(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def set_leave(self, ctx, *, message: str):
         """Set leave message for members who leave"""
-        async with aiosqlite.connect(os.getenv('DATABASE_PATH')) as db:
-            await db.execute(
-                'INSERT OR REPLACE INTO guild_settings (guild_id, leave_message) VALUES (?, ?)',
-                (ctx.guild.id, message)
-            )
-            await db.commit()
+        await self.bot.settings.update(ctx.guild.id, leave_message=message)
         
         embed = discord.Embed(
             title="✅ Leave Message Set",
@@ -86,12 +75,7 @@ class Admin(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def set_autorole(self, ctx, role: discord.Role):
         """Set a role to be automatically assigned to new members"""
-        async with aiosqlite.connect(os.getenv('DATABASE_PATH')) as db:
-            await db.execute(
-                'INSERT OR REPLACE INTO guild_settings (guild_id, autorole_id) VALUES (?, ?)',
-                (ctx.guild.id, role.id)
-            )
-            await db.commit()
+        await self.bot.settings.update(ctx.guild.id, autorole_id=role.id)
         
         embed = discord.Embed(
             title="✅ Auto-role Set",
@@ -104,12 +88,7 @@ class Admin(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def remove_autorole(self, ctx):
         """Remove the auto-role"""
-        async with aiosqlite.connect(os.getenv('DATABASE_PATH')) as db:
-            await db.execute(
-                'UPDATE guild_settings SET autorole_id = NULL WHERE guild_id = ?',
-                (ctx.guild.id,)
-            )
-            await db.commit()
+        await self.bot.settings.update(ctx.guild.id, autorole_id=None)
         
         embed = discord.Embed(
             title="✅ Auto-role Removed",
@@ -122,24 +101,23 @@ class Admin(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def settings(self, ctx):
         """View current server settings"""
-        async with aiosqlite.connect(os.getenv('DATABASE_PATH')) as db:
-            cursor = await db.execute(
-                'SELECT prefix, welcome_channel_id, welcome_message, leave_message, autorole_id FROM guild_settings WHERE guild_id = ?',
-                (ctx.guild.id,)
-            )
-            row = await cursor.fetchone()
+        settings = self.bot.settings.get(ctx.guild.id)
         
         embed = discord.Embed(
             title=f"⚙️ Server Settings - {ctx.guild.name}",
             color=discord.Color.red()
         )
         
-        if row:
-            prefix, welcome_ch_id, welcome_msg, leave_msg, autorole_id = row
+        if settings:
+            prefix = settings['prefix']
+            welcome_ch_id = settings['welcome_channel_id']
+            welcome_msg = settings['welcome_message']
+            leave_msg = settings['leave_message']
+            autorole_id = settings['autorole_id']
             
             embed.add_field(
                 name="Prefix",
-                value=prefix or f"`{os.getenv('PREFIX')}` (default)",
+                value=prefix or f"`{self.bot.settings.default_prefix}` (default)",
                 inline=False
             )
             
@@ -175,6 +153,190 @@ class Admin(commands.Cog):
         
         await ctx.send(embed=embed)
     
+    @commands.command(name='joinstats')
+    @commands.has_permissions(administrator=True)
+    async def join_stats(self, ctx):
+        """View the welcome and auto-role queue"""
+        joins = self.joins
+        embed = discord.Embed(
+            title="📥 Join Pipeline",
+            color=discord.Color.red()
+        )
+        embed.add_field(name="Queue Depth", value=joins.depth, inline=True)
+        embed.add_field(name="Pending Here", value=len(joins.welcomes.get(ctx.guild.id, [])), inline=True)
+        embed.add_field(name="Welcomes Sent", value=joins.welcomes_sent, inline=True)
+        embed.add_field(name="Roles Assigned", value=joins.roles_assigned, inline=True)
+        embed.add_field(name="Roles Failed", value=joins.roles_failed, inline=True)
+        embed.add_field(name="Role Lag", value=f"{joins.last_lag:.2f}s (max {joins.max_lag:.2f}s)", inline=True)
+        await ctx.send(embed=embed)
+    
+    @commands.command(name='startup')
+    @commands.is_owner()
+    async def startup(self, ctx):
+        """View how long the last startup took, per cog"""
+        report = getattr(self.bot, 'startup_report', {})
+        embed = discord.Embed(
+            title="🚀 Startup Report",
+            color=discord.Color.red()
+        )
+        
+        if 'database' in report:
+            embed.add_field(name="Database", value=f"{report['database'] * 1000:.0f}ms", inline=True)
+        if 'total' in report:
+            embed.add_field(name="Setup Total", value=f"{report['total'] * 1000:.0f}ms", inline=True)
+        if 'ready' in report:
+            embed.add_field(name="Ready After", value=f"{report['ready']:.1f}s", inline=True)
+        if report.get('first_command') is not None:
+            embed.add_field(name="First Command After", value=f"{report['first_command']:.1f}s", inline=True)
+        
+        timings = report.get('extensions', {})
+        if timings:
+            lines = [
+                f"`{name}` - {'failed' if seconds is None else f'{seconds * 1000:.0f}ms'}"
+                for name, seconds in sorted(timings.items(), key=lambda item: -(item[1] or 0))
+            ]
+            embed.add_field(name="Extensions", value="\n".join(lines)[:1024], inline=False)
+        
+        await ctx.send(embed=embed)
+    
+    @commands.command(name='cachereport')
+    @commands.is_owner()
+    async def cache_report(self, ctx, limit: int = 10):
+        """View estimated cache memory for the largest cached guilds"""
+        report = guild_memory_report(self.bot, limit=max(1, min(limit, 25)))
+        flags = self.bot._connection.member_cache_flags
+        max_messages = self.bot._connection.max_messages
+        
+        embed = discord.Embed(
+            title="🧠 Cache Report",
+            color=discord.Color.red()
+        )
+        embed.add_field(
+            name="Member Cache",
+            value=", ".join(name for name, enabled in flags if enabled) or "none",
+            inline=True
+        )
+        embed.add_field(
+            name="Messages Cached",
+            value=f"{len(self.bot.cached_messages):,} / {max_messages:,}" if max_messages else "disabled",
+            inline=True
+        )
+        health = self.bot.health.latest()
+        embed.add_field(name="Process RSS", value=f"{health.rss / 1024 / 1024:.1f} MB" if health else "not sampled yet", inline=True)
+        
+        lines = [
+            f"**{entry['guild'].name}** - {entry['bytes'] / 1024:,.0f} KB, "
+            f"{entry['members_cached']:,}/{entry['member_count']:,} members{' (chunked)' if entry['chunked'] else ''}"
+            for entry in report
+        ]
+        embed.add_field(name="Largest Guilds", value="\n".join(lines)[:1024] or "No guilds cached", inline=False)
+        await ctx.send(embed=embed)
+    
+    @commands.command(name='reload')
+    @commands.is_owner()
+    async def reload(self, ctx, extension: str):
+        """Reload a cog without restarting the bot, keeping its in-memory state"""
+        name = extension if extension.startswith('cogs.') else f'cogs.{extension.lower()}'
+        if name not in self.bot.extensions:
+            await ctx.send(f"❌ `{name}` is not loaded!")
+            return
+        
+        started = time.perf_counter()
+        try:
+            restored = await reload_with_state(self.bot, name)
+        except commands.ExtensionError as e:
+            log.error('Failed to reload %s', name, exc_info=e, extra=command_context(ctx))
+            await ctx.send(f"❌ Failed to reload `{name}`, the previous version is still running: {e}")
+            return
+        
+        embed = discord.Embed(
+            title="🔄 Extension Reloaded",
+            description=f"Reloaded `{name}` in {(time.perf_counter() - started) * 1000:.0f}ms",
+            color=discord.Color.green()
+        )
+        if restored:
+            embed.add_field(name="State Restored", value=", ".join(restored), inline=False)
+        await ctx.send(embed=embed)
+    
+    @commands.command(name='perf')
+    @commands.is_owner()
+    async def perf(self, ctx, sort: str = 'p95'):
+        """View command and listener latency (sort by p95, count, errors or total)"""
+        keys = {
+            'p95': lambda item: item[1].percentiles(0.95)[0],
+            'count': lambda item: item[1].count,
+            'errors': lambda item: item[1].error_rate,
+            'total': lambda item: item[1].total,
+        }
+        if sort not in keys:
+            await ctx.send(f"❌ Sort by one of: {', '.join(keys)}")
+            return
+        
+        timings = sorted(self.bot.metrics.timings.items(), key=keys[sort], reverse=True)
+        embed = discord.Embed(
+            title="⏱️ Performance",
+            color=discord.Color.red()
+        )
+        if not timings:
+            embed.description = "No commands or listeners have run yet"
+        
+        lines = []
+        for (kind, name), timing in timings[:15]:
+            p50, p95, p99 = timing.percentiles(0.5, 0.95, 0.99)
+            lines.append(
+                f"`{name}`{' (listener)' if kind == 'listener' else ''} - {timing.count:,} runs, "
+                f"{timing.error_rate:.1%} errors\n"
+                f"p50 {p50 * 1000:.1f}ms • p95 {p95 * 1000:.1f}ms • p99 {p99 * 1000:.1f}ms"
+            )
+        if lines:
+            embed.description = "\n".join(lines)[:4096]
+        outbox = self.bot.outbox
+        embed.add_field(
+            name="Outbox",
+            value=f"{outbox.depth:,} queued • {outbox.sent:,} sent • {outbox.merged:,} merged • {outbox.dropped:,} dropped",
+            inline=False
+        )
+        embed.set_footer(text=f"Sorted by {sort} • percentiles over the last 1024 runs")
+        await ctx.send(embed=embed)
+    
+    @commands.command(name='health')
+    @commands.is_owner()
+    async def health(self, ctx):
+        """View process CPU, memory, event loop lag, tasks and latency over the last hour"""
+        sampler = self.bot.health
+        latest = sampler.latest()
+        if latest is None:
+            await ctx.send("⏳ No health samples yet, try again in a few seconds")
+            return
+        
+        span = len(sampler.samples) * sampler.interval
+        embed = discord.Embed(
+            title="🩺 Health",
+            color=discord.Color.red()
+        )
+        metrics = [
+            ('CPU', 'cpu', lambda value: f"{value:.1f}%"),
+            ('Memory', 'rss', lambda value: f"{value / 1024 / 1024:.0f} MB"),
+            ('Loop Lag', 'lag', lambda value: f"{value * 1000:.0f}ms"),
+            ('Tasks', 'tasks', lambda value: f"{value:,.0f}"),
+            ('Gateway Latency', 'latency', lambda value: f"{value * 1000:.0f}ms"),
+        ]
+        for name, field, fmt in metrics:
+            current = getattr(latest, field)
+            recent = sampler.summary(field, 300)
+            hour = sampler.summary(field, 3600)
+            if current is None or recent is None:
+                embed.add_field(name=name, value="no data", inline=False)
+                continue
+            embed.add_field(
+                name=name,
+                value=f"now {fmt(current)} • 5m avg {fmt(recent[0])} • 1h max {fmt(hour[1])}\n"
+                      f"`{sampler.sparkline(field, 3600) or '-'}`",
+                inline=False
+            )
+        embed.set_footer(text=f"{len(sampler.samples)} samples every {sampler.interval:g}s • trends cover {min(span, 3600) / 60:.0f} min")
+        await ctx.send(embed=embed)
+    
     @commands.command(name='nickname')
     @commands.has_permissions(manage_nicknames=True)
     async def nickname(self, ctx, member: discord.Member, *, nickname: str = None):
@@ -239,59 +401,26 @@ class Admin(commands.Cog):
         await ctx.send(embed=embed)
     
     @commands.Cog.listener()
+    @timed('Admin.on_member_join')
     async def on_member_join(self, member):
         """Handle member join events"""
-        async with aiosqlite.connect(os.getenv('DATABASE_PATH')) as db:
-            cursor = await db.execute(
-                'SELECT welcome_channel_id, welcome_message, autorole_id FROM guild_settings WHERE guild_id = ?',
-                (member.guild.id,)
-            )
-            row = await cursor.fetchone()
-            
-            if row:
-                welcome_ch_id, welcome_msg, autorole_id = row
-                
-                # Send welcome message
-                if welcome_ch_id and welcome_msg:
-                    channel = member.guild.get_channel(welcome_ch_id)
-                    if channel:
-                        msg = welcome_msg.replace("{user}", member.mention).replace("{server}", member.guild.name)
-                        embed = discord.Embed(
-                            description=msg,
-                            color=discord.Color.green()
-                        )
-                        embed.set_thumbnail(url=member.display_avatar.url)
-                        await channel.send(embed=embed)
-                
-                # Assign auto-role
-                if autorole_id:
-                    role = member.guild.get_role(autorole_id)
-                    if role:
-                        await member.add_roles(role)
+        self.joins.submit(member)
     
     @commands.Cog.listener()
+    @timed('Admin.on_member_remove')
     async def on_member_remove(self, member):
         """Handle member leave events"""
-        async with aiosqlite.connect(os.getenv('DATABASE_PATH')) as db:
-            cursor = await db.execute(
-                'SELECT welcome_channel_id, leave_message FROM guild_settings WHERE guild_id = ?',
-                (member.guild.id,)
-            )
-            row = await cursor.fetchone()
-            
-            if row and row[1]:
-                channel_id, leave_msg = row
-                if channel_id:
-                    channel = member.guild.get_channel(channel_id)
-                    if channel:
-                        msg = leave_msg.replace("{user}", str(member)).replace("{server}", member.guild.name)
-                        embed = discord.Embed(
-                            description=msg,
-                            color=discord.Color.red()
-                        )
-                        await channel.send(embed=embed)
+        settings = self.bot.settings.get(member.guild.id)
+        
+        if settings and settings['leave_message']:
+            channel_id = settings['welcome_channel_id']
+            leave_msg = settings['leave_message']
+            if channel_id:
+                channel = member.guild.get_channel(channel_id)
+                if channel:
+                    msg = leave_msg.replace("{user}", str(member)).replace("{server}", member.guild.name)
+                    # Leaves during a raid or prune are merged into one message per channel
+                    self.bot.outbox.notify(channel, msg, group='leave', color=discord.Color.red())
 
 async def setup(bot):
-    cog = Admin(bot)
-    await cog.init_db()
-    await bot.add_cog(cog)
+    await bot.add_cog(Admin(bot))
@@ -15,6 +15,10 @@ class Games(commands.Cog):
             {"question": "What is the largest planet in our solar system?", "answer": "Jupiter"},
         ]
     
+    async def reply(self, ctx, content=None, **kwargs):
+        """Send through the outbox so game chatter is paced per channel"""
+        return await self.bot.outbox.send(ctx.channel, content=content, **kwargs)
+    
     @commands.command(name='8ball')
     async def eight_ball(self, ctx, *, question):
         """Ask the magic 8-ball a question"""
@@ -47,13 +51,13 @@ class Games(commands.Cog):
         )
         embed.add_field(name="Question", value=question, inline=False)
         embed.add_field(name="Answer", value=random.choice(responses), inline=False)
-        await ctx.send(embed=embed)
+        await self.reply(ctx, embed=embed)
     
     @commands.command(name='dice', aliases=['roll'])
     async def dice(self, ctx, sides: int = 6):
         """Roll a dice with specified number of sides"""
         if sides < 2:
-            await ctx.send("Dice must have at least 2 sides!")
+            await self.reply(ctx, "Dice must have at least 2 sides!")
             return
         
         result = random.randint(1, sides)
@@ -62,7 +66,7 @@ class Games(commands.Cog):
             description=f"You rolled a **{result}** on a {sides}-sided dice!",
             color=discord.Color.red()
         )
-        await ctx.send(embed=embed)
+        await self.reply(ctx, embed=embed)
     
     @commands.command(name='coinflip', aliases=['flip'])
     async def coinflip(self, ctx):
@@ -73,7 +77,7 @@ class Games(commands.Cog):
             description=f"The coin landed on **{result}**!",
             color=discord.Color.red()
         )
-        await ctx.send(embed=embed)
+        await self.reply(ctx, embed=embed)
     
     @commands.command(name='trivia')
     async def trivia(self, ctx):
@@ -86,7 +90,7 @@ class Games(commands.Cog):
             color=discord.Color.red()
         )
         embed.set_footer(text="You have 30 seconds to answer!")
-        await ctx.send(embed=embed)
+        await self.reply(ctx, embed=embed)
         
         def check(m):
             return m.author == ctx.author and m.channel == ctx.channel
@@ -94,11 +98,11 @@ class Games(commands.Cog):
         try:
             msg = await self.bot.wait_for('message', check=check, timeout=30.0)
             if msg.content.lower() == question_data["answer"].lower():
-                await ctx.send(f"✅ Correct! The answer is **{question_data['answer']}**!")
+                await self.reply(ctx, f"✅ Correct! The answer is **{question_data['answer']}**!")
             else:
-                await ctx.send(f"❌ Wrong! The correct answer is **{question_data['answer']}**.")
+                await self.reply(ctx, f"❌ Wrong! The correct answer is **{question_data['answer']}**.")
         except:
-            await ctx.send(f"⏰ Time's up! The answer was **{question_data['answer']}**.")
+            await self.reply(ctx, f"⏰ Time's up! The answer was **{question_data['answer']}**.")
     
     @commands.command(name='rps')
     async def rock_paper_scissors(self, ctx, choice: str):
@@ -107,7 +111,7 @@ class Games(commands.Cog):
         choice = choice.lower()
         
         if choice not in choices:
-            await ctx.send("Please choose rock, paper, or scissors!")
+            await self.reply(ctx, "Please choose rock, paper, or scissors!")
             return
         
         bot_choice = random.choice(choices)
@@ -131,13 +135,13 @@ class Games(commands.Cog):
         embed.add_field(name="Your choice", value=choice.capitalize(), inline=True)
         embed.add_field(name="My choice", value=bot_choice.capitalize(), inline=True)
         embed.add_field(name="Result", value=result, inline=False)
-        await ctx.send(embed=embed)
+        await self.reply(ctx, embed=embed)
     
     @commands.command(name='guess')
     async def guess_number(self, ctx, max_number: int = 100):
         """Play a number guessing game"""
         if max_number < 2:
-            await ctx.send("Maximum number must be at least 2!")
+            await self.reply(ctx, "Maximum number must be at least 2!")
             return
         
         number = random.randint(1, max_number)
@@ -147,7 +151,7 @@ class Games(commands.Cog):
             description=f"I'm thinking of a number between 1 and {max_number}. You have 5 tries!",
             color=discord.Color.red()
         )
-        await ctx.send(embed=embed)
+        await self.reply(ctx, embed=embed)
         
         def check(m):
             return m.author == ctx.author and m.channel == ctx.channel and m.content.isdigit()
@@ -158,17 +162,17 @@ class Games(commands.Cog):
                 guess = int(msg.content)
                 
                 if guess == number:
-                    await ctx.send(f"🎉 Correct! You guessed it in {attempt} {'try' if attempt == 1 else 'tries'}!")
+                    await self.reply(ctx, f"🎉 Correct! You guessed it in {attempt} {'try' if attempt == 1 else 'tries'}!")
                     return
                 elif guess < number:
-                    await ctx.send(f"📈 Too low! {5 - attempt} {'try' if 5 - attempt == 1 else 'tries'} left.")
+                    await self.reply(ctx, f"📈 Too low! {5 - attempt} {'try' if 5 - attempt == 1 else 'tries'} left.")
                 else:
-                    await ctx.send(f"📉 Too high! {5 - attempt} {'try' if 5 - attempt == 1 else 'tries'} left.")
+                    await self.reply(ctx, f"📉 Too high! {5 - attempt} {'try' if 5 - attempt == 1 else 'tries'} left.")
             except:
-                await ctx.send(f"⏰ Time's up! The number was **{number}**.")
+                await self.reply(ctx, f"⏰ Time's up! The number was **{number}**.")
                 return
         
-        await ctx.send(f"💔 You ran out of tries! The number was **{number}**.")
+        await self.reply(ctx, f"💔 You ran out of tries! The number was **{number}**.")
 
 async def setup(bot):
     await bot.add_cog(Games(bot))
@@ -1,12 +1,26 @@
 import discord
 from discord.ext import commands
 import datetime
+import logging
+from utils.embed_cache import EmbedCache
+from utils.help_index import HelpIndex
+from utils.log import command_context
+
+log = logging.getLogger(__name__)
 
 class General(commands.Cog):
     """General bot commands"""
     
     def __init__(self, bot):
         self.bot = bot
+        self.index = HelpIndex(bot)
+        self.embeds = EmbedCache()
+    
+    @commands.Cog.listener()
+    async def on_extensions_changed(self):
+        """Commands were added or removed, so the help index and command counts are stale"""
+        self.index.invalidate()
+        self.embeds.clear()
     
     @commands.command(name='ping')
     async def ping(self, ctx):
@@ -23,49 +37,23 @@ class General(commands.Cog):
         """Show help for commands"""
         if command_name:
             # Show help for specific command
-            command = self.bot.get_command(command_name)
+            command, suggestions = self.index.find(command_name)
             if command is None:
-                await ctx.send(f"Command `{command_name}` not found!")
+                hint = f" Did you mean {', '.join(f'`{name}`' for name in suggestions)}?" if suggestions else ""
+                await ctx.send(f"Command `{command_name}` not found!{hint}")
                 return
             
-            embed = discord.Embed(
-                title=f"Help - {command.name}",
-                description=command.help or "No description available",
-                color=discord.Color.red()
-            )
-            
-            if command.aliases:
-                embed.add_field(name="Aliases", value=", ".join(command.aliases), inline=False)
-            
-            usage = f"{ctx.prefix}{command.name}"
-            if command.signature:
-                usage += f" {command.signature}"
-            embed.add_field(name="Usage", value=f"`{usage}`", inline=False)
-            
-            await ctx.send(embed=embed)
+            await ctx.send(embed=self.index.command_help(command, ctx.prefix))
         else:
             # Show all commands
-            embed = discord.Embed(
-                title="📚 Bot Commands",
-                description=f"Use `{ctx.prefix}help <command>` for more info on a command",
-                color=discord.Color.red()
-            )
-            
-            for cog_name, cog in self.bot.cogs.items():
-                commands_list = [cmd.name for cmd in cog.get_commands() if not cmd.hidden]
-                if commands_list:
-                    embed.add_field(
-                        name=f"**{cog_name}**",
-                        value=", ".join(f"`{cmd}`" for cmd in commands_list[:10]),
-                        inline=False
-                    )
-            
-            embed.set_footer(text=f"Total Commands: {len(list(self.bot.commands))}")
-            await ctx.send(embed=embed)
+            await ctx.send(embed=self.index.overview(ctx.prefix))
     
     @commands.command(name='about')
     async def about(self, ctx):
         """Learn more about the bot"""
+        await ctx.send(embed=self.embeds.get('about', self._about_embed, ttl=60))
+    
+    def _about_embed(self):
         embed = discord.Embed(
             title=f"About {self.bot.user.name}",
             description="A comprehensive Discord bot with moderation, music, games, and much more!",
@@ -83,15 +71,14 @@ class General(commands.Cog):
         
         embed.add_field(name="Servers", value=len(self.bot.guilds), inline=True)
         embed.add_field(name="Users", value=len(self.bot.users), inline=True)
-        embed.add_field(name="Commands", value=len(list(self.bot.commands)), inline=True)
+        embed.add_field(name="Commands", value=len(self.bot.commands), inline=True)
         
         embed.add_field(
             name="Support",
             value="Need help? Contact the server administrators!",
             inline=False
         )
-        
-        await ctx.send(embed=embed)
+        return embed
     
     @commands.command(name='uptime')
     async def uptime(self, ctx):
@@ -141,7 +128,7 @@ class General(commands.Cog):
         await ctx.send(embed=embed)
         
         # Log feedback (in a real bot, you'd send this to a logging channel)
-        print(f"Feedback from {ctx.author}: {message}")
+        log.info("Feedback from %s: %s", ctx.author, message, extra=command_context(ctx))
     
     @commands.command(name='servericon')
     async def servericon(self, ctx):
@@ -159,21 +146,37 @@ class General(commands.Cog):
     @commands.command(name='stats')
     async def stats(self, ctx):
         """Display bot statistics"""
+        # Cluster totals are only republished every interval, so rebuilding more often gains nothing
+        embed = await self.embeds.get_async('stats', self._stats_embed, ttl=self.bot.cluster.interval)
+        await ctx.send(embed=embed)
+    
+    async def _stats_embed(self):
+        totals = await self.bot.cluster.totals()
         embed = discord.Embed(
             title="📊 Bot Statistics",
             color=discord.Color.red(),
             timestamp=datetime.datetime.now()
         )
         
-        embed.add_field(name="Servers", value=len(self.bot.guilds), inline=True)
-        embed.add_field(name="Users", value=len(self.bot.users), inline=True)
-        embed.add_field(name="Commands", value=len(list(self.bot.commands)), inline=True)
+        embed.add_field(name="Servers", value=totals['guilds'], inline=True)
+        embed.add_field(name="Users", value=totals['users'], inline=True)
+        embed.add_field(name="Commands", value=len(self.bot.commands), inline=True)
         
         embed.add_field(name="Text Channels", value=len(list(self.bot.get_all_channels())), inline=True)
         embed.add_field(name="Cogs Loaded", value=len(self.bot.cogs), inline=True)
-        embed.add_field(name="Latency", value=f"{round(self.bot.latency * 1000)}ms", inline=True)
+        embed.add_field(name="Latency", value=f"{round(totals['latency'] * 1000)}ms", inline=True)
         
-        await ctx.send(embed=embed)
+        health = self.bot.health.latest()
+        if health:
+            peak = self.bot.health.summary('rss', 3600)[1]
+            embed.add_field(name="Memory", value=f"{health.rss / 1024 / 1024:.0f} MB (1h peak {peak / 1024 / 1024:.0f} MB)", inline=True)
+            embed.add_field(name="CPU Usage", value=f"{health.cpu:.1f}%", inline=True)
+        
+        if self.bot.cluster.clustered:
+            embed.add_field(name="Shards", value=totals['shards'], inline=True)
+            embed.add_field(name="Clusters", value=totals['clusters'], inline=True)
+            embed.set_footer(text=f"Text channels, memory and CPU are for cluster {self.bot.cluster.cluster_id} only")
+        return embed
 
 async def setup(bot):
     await bot.add_cog(General(bot))
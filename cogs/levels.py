@@ -1,39 +1,72 @@
 import discord
 from discord.ext import commands
-import aiosqlite
 import os
 import random
+from utils.cache_policy import has_full_member_list, role_members
+from utils.cooldowns import CooldownMap
+from utils.leaderboard import LeaderboardCache
+from utils.leveling import MAX_LEVEL, level_for_xp, xp_for_level
+from utils.metrics import timed
+from utils.ranking import RankIndex
+from utils.xp_buffer import XPBuffer
 
 class Levels(commands.Cog):
     """Level and XP tracking system"""
     
     def __init__(self, bot):
         self.bot = bot
-        self.cooldowns = {}
-    
-    async def init_db(self):
-        """Initialize the levels database"""
-        async with aiosqlite.connect(os.getenv('DATABASE_PATH')) as db:
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS levels (
-                    user_id INTEGER,
-                    guild_id INTEGER,
-                    xp INTEGER DEFAULT 0,
-                    level INTEGER DEFAULT 0,
-                    PRIMARY KEY (user_id, guild_id)
-                )
-            ''')
-            await db.commit()
+        self.cooldowns = CooldownMap()
+        self.default_cooldown = int(os.getenv('XP_COOLDOWN', 60))
+        self.guild_cooldowns = {}
+        self.xp_buffer = XPBuffer(
+            bot.db,
+            self.calculate_level,
+            flush_interval=float(os.getenv('XP_FLUSH_INTERVAL', 10)),
+            max_pending=int(os.getenv('XP_FLUSH_SIZE', 500))
+        )
+        self.ranks = RankIndex(
+            bot.db,
+            max_guilds=int(os.getenv('RANK_INDEX_GUILDS', 100)),
+            overlay=self.xp_buffer.guild_totals
+        )
+        self.leaderboards = LeaderboardCache(per_page=10)
+        self.xp_buffer.on_update = self.on_xp_update
+        self.xp_buffer.on_write = self.on_xp_write
+    
+    async def cog_load(self):
+        rows = await self.bot.db.fetchall('SELECT guild_id, xp_cooldown FROM level_settings')
+        self.guild_cooldowns = {guild_id: cooldown for guild_id, cooldown in rows if cooldown is not None}
+        await self.xp_buffer.start()
+    
+    async def cog_unload(self):
+        await self.xp_buffer.close()
+    
+    def export_state(self):
+        """XP cooldowns to carry over when the extension is reloaded (buffered XP is flushed on unload)"""
+        return {'cooldowns': self.cooldowns}
+    
+    def import_state(self, state):
+        self.cooldowns = state['cooldowns']
+    
+    def on_xp_update(self, guild_id, user_id, xp):
+        """Keep in-memory rankings in sync with buffered XP gains"""
+        self.ranks.update(guild_id, user_id, xp)
+    
+    def on_xp_write(self, guild_ids):
+        """Cached leaderboard pages are read from the database, so they only go stale once XP is written"""
+        for guild_id in guild_ids:
+            self.leaderboards.invalidate(guild_id)
     
     def calculate_level(self, xp):
         """Calculate level from XP"""
-        return int((xp / 100) ** 0.5)
+        return level_for_xp(xp)
     
     def calculate_xp_for_level(self, level):
         """Calculate XP required for a level"""
-        return (level ** 2) * 100
+        return xp_for_level(level)
     
     @commands.Cog.listener()
+    @timed('Levels.on_message')
     async def on_message(self, message):
         """Award XP for messages"""
         if message.author.bot:
@@ -42,69 +75,52 @@ class Levels(commands.Cog):
         if not message.guild:
             return
         
-        # Cooldown check (1 minute)
-        key = (message.author.id, message.guild.id)
-        if key in self.cooldowns:
+        # Cooldown check (per-guild, 1 minute by default)
+        cooldown = self.guild_cooldowns.get(message.guild.id, self.default_cooldown)
+        if not self.cooldowns.try_acquire((message.author.id, message.guild.id), cooldown):
             return
         
-        self.cooldowns[key] = True
-        
         # Award XP
         xp_gain = random.randint(15, 25)
         
-        async with aiosqlite.connect(os.getenv('DATABASE_PATH')) as db:
-            # Get current stats
-            cursor = await db.execute(
-                'SELECT xp, level FROM levels WHERE user_id = ? AND guild_id = ?',
-                (message.author.id, message.guild.id)
-            )
-            row = await cursor.fetchone()
-            
-            if row:
-                current_xp, current_level = row
-                new_xp = current_xp + xp_gain
-                new_level = self.calculate_level(new_xp)
-                
-                await db.execute(
-                    'UPDATE levels SET xp = ?, level = ? WHERE user_id = ? AND guild_id = ?',
-                    (new_xp, new_level, message.author.id, message.guild.id)
-                )
-                
-                # Level up notification
-                if new_level > current_level:
-                    embed = discord.Embed(
-                        title="🎉 Level Up!",
-                        description=f"{message.author.mention} is now level **{new_level}**!",
-                        color=discord.Color.red()
-                    )
-                    await message.channel.send(embed=embed, delete_after=10)
-            else:
-                # Create new entry
-                new_level = self.calculate_level(xp_gain)
-                await db.execute(
-                    'INSERT INTO levels (user_id, guild_id, xp, level) VALUES (?, ?, ?, ?)',
-                    (message.author.id, message.guild.id, xp_gain, new_level)
-                )
-            
-            await db.commit()
+        current_level, new_level = await self.xp_buffer.add(message.author.id, message.guild.id, xp_gain)
         
-        # Remove from cooldown after 60 seconds
-        await discord.utils.sleep_until(discord.utils.utcnow() + discord.timedelta(seconds=60))
-        if key in self.cooldowns:
-            del self.cooldowns[key]
+        # Level up notification
+        if new_level > current_level:
+            self.bot.outbox.notify(
+                message.channel,
+                f"{message.author.mention} is now level **{new_level}**!",
+                group='levelup',
+                title="🎉 Level Up!",
+                color=discord.Color.red(),
+                delete_after=10
+            )
     
     @commands.command(name='rank', aliases=['level'])
     async def rank(self, ctx, member: discord.Member = None):
         """Check your or another user's rank"""
         member = member or ctx.author
+        top_percent = None
         
-        async with aiosqlite.connect(os.getenv('DATABASE_PATH')) as db:
+        if self.ranks.enabled:
+            ranking = await self.ranks.get(ctx.guild.id)
+            xp = ranking.xp(member.id)
+            
+            if xp is None:
+                await ctx.send(f"{member.mention} has no XP yet!")
+                return
+            
+            level = self.calculate_level(xp)
+            rank = ranking.rank(member.id)
+            top_percent = 100 * rank / len(ranking)
+        else:
+            await self.xp_buffer.flush()
+            
             # Get user stats
-            cursor = await db.execute(
+            row = await self.bot.db.fetchone(
                 'SELECT xp, level FROM levels WHERE user_id = ? AND guild_id = ?',
                 (member.id, ctx.guild.id)
             )
-            row = await cursor.fetchone()
             
             if not row:
                 await ctx.send(f"{member.mention} has no XP yet!")
@@ -113,118 +129,181 @@ class Levels(commands.Cog):
             xp, level = row
             
             # Get rank
-            cursor = await db.execute(
+            rank = await self.bot.db.fetchval(
                 'SELECT COUNT(*) FROM levels WHERE guild_id = ? AND xp > ?',
-                (ctx.guild.id, xp)
-            )
-            rank_row = await cursor.fetchone()
-            rank = rank_row[0] + 1 if rank_row else 1
-            
-            # Calculate XP for next level
-            xp_for_current = self.calculate_xp_for_level(level)
-            xp_for_next = self.calculate_xp_for_level(level + 1)
-            xp_progress = xp - xp_for_current
-            xp_needed = xp_for_next - xp_for_current
-            
-            embed = discord.Embed(
-                title=f"📊 Rank - {member.display_name}",
-                color=discord.Color.red()
-            )
-            embed.set_thumbnail(url=member.display_avatar.url)
-            embed.add_field(name="Rank", value=f"#{rank}", inline=True)
-            embed.add_field(name="Level", value=level, inline=True)
-            embed.add_field(name="XP", value=f"{xp:,}", inline=True)
-            embed.add_field(
-                name="Progress to Next Level",
-                value=f"{xp_progress}/{xp_needed} XP ({int(xp_progress/xp_needed*100)}%)",
-                inline=False
-            )
-            
-            await ctx.send(embed=embed)
+                (ctx.guild.id, xp),
+                default=0
+            ) + 1
+        
+        # Calculate XP for next level
+        xp_for_current = self.calculate_xp_for_level(level)
+        xp_for_next = self.calculate_xp_for_level(level + 1)
+        xp_progress = xp - xp_for_current
+        xp_needed = xp_for_next - xp_for_current
+        
+        embed = discord.Embed(
+            title=f"📊 Rank - {member.display_name}",
+            color=discord.Color.red()
+        )
+        embed.set_thumbnail(url=member.display_avatar.url)
+        embed.add_field(
+            name="Rank",
+            value=f"#{rank}" if top_percent is None else f"#{rank} (top {top_percent:.1f}%)",
+            inline=True
+        )
+        embed.add_field(name="Level", value=level, inline=True)
+        embed.add_field(name="XP", value=f"{xp:,}", inline=True)
+        embed.add_field(
+            name="Progress to Next Level",
+            value="Max level reached" if level >= MAX_LEVEL else f"{xp_progress}/{xp_needed} XP ({int(xp_progress/xp_needed*100)}%)",
+            inline=False
+        )
+        
+        await ctx.send(embed=embed)
     
     @commands.command(name='leaderboard', aliases=['lb', 'top'])
     async def leaderboard(self, ctx, page: int = 1):
         """View the server leaderboard"""
-        if page < 1:
-            page = 1
-        
-        per_page = 10
-        offset = (page - 1) * per_page
+        board = self.leaderboards.get(ctx.guild.id)
         
-        async with aiosqlite.connect(os.getenv('DATABASE_PATH')) as db:
-            # Get total count
-            cursor = await db.execute(
+        # Pages show written XP; gains still in the buffer appear after the next flush
+        if board.total is None:
+            board.total = await self.bot.db.fetchval(
                 'SELECT COUNT(*) FROM levels WHERE guild_id = ?',
-                (ctx.guild.id,)
+                (ctx.guild.id,),
+                default=0
             )
-            total_row = await cursor.fetchone()
-            total = total_row[0] if total_row else 0
-            
-            if total == 0:
-                await ctx.send("No one has earned XP yet!")
-                return
-            
-            # Get leaderboard
-            cursor = await db.execute(
-                'SELECT user_id, xp, level FROM levels WHERE guild_id = ? ORDER BY xp DESC LIMIT ? OFFSET ?',
-                (ctx.guild.id, per_page, offset)
-            )
-            rows = await cursor.fetchall()
-            
-            embed = discord.Embed(
-                title=f"📊 Leaderboard - {ctx.guild.name}",
-                description=f"Page {page}/{((total - 1) // per_page) + 1}",
-                color=discord.Color.red()
+        
+        if board.total == 0:
+            await ctx.send("No one has earned XP yet!")
+            return
+        
+        page = min(max(page, 1), board.page_count())
+        description = board.rendered.get(page)
+        
+        if description is None:
+            # Get leaderboard, skipping members who have left the server
+            rows = await board.fetch_page(
+                self.bot.db,
+                ctx.guild.id,
+                page - 1,
+                # Without a full member cache departures can't be told apart from uncached members
+                lambda user_id: not has_full_member_list(ctx.guild) or ctx.guild.get_member(user_id) is not None
             )
             
             description = ""
-            for idx, (user_id, xp, level) in enumerate(rows, start=offset + 1):
-                user = ctx.guild.get_member(user_id)
-                if user:
-                    medal = "🥇" if idx == 1 else "🥈" if idx == 2 else "🥉" if idx == 3 else "▫️"
-                    description += f"{medal} **{idx}.** {user.mention} - Level {level} ({xp:,} XP)\n"
+            for idx, user_id, xp, level in rows:
+                medal = "🥇" if idx == 1 else "🥈" if idx == 2 else "🥉" if idx == 3 else "▫️"
+                description += f"{medal} **{idx}.** <@{user_id}> - Level {level} ({xp:,} XP)\n"
             
-            embed.description = description or "No entries on this page"
-            await ctx.send(embed=embed)
+            description = description or "No entries on this page"
+            board.rendered[page] = description
+        
+        embed = discord.Embed(
+            title=f"📊 Leaderboard - {ctx.guild.name}",
+            description=description,
+            color=discord.Color.red()
+        )
+        embed.set_footer(text=f"Page {page}/{board.page_count()} • {board.total:,} ranked members")
+        await ctx.send(embed=embed)
     
     @commands.command(name='givexp')
     @commands.has_permissions(administrator=True)
     async def give_xp(self, ctx, member: discord.Member, amount: int):
         """Give XP to a user (Admin only)"""
-        async with aiosqlite.connect(os.getenv('DATABASE_PATH')) as db:
-            cursor = await db.execute(
-                'SELECT xp, level FROM levels WHERE user_id = ? AND guild_id = ?',
-                (member.id, ctx.guild.id)
-            )
-            row = await cursor.fetchone()
-            
-            if row:
-                current_xp, current_level = row
-                new_xp = max(0, current_xp + amount)
-                new_level = self.calculate_level(new_xp)
-                
-                await db.execute(
-                    'UPDATE levels SET xp = ?, level = ? WHERE user_id = ? AND guild_id = ?',
-                    (new_xp, new_level, member.id, ctx.guild.id)
-                )
-            else:
-                new_xp = max(0, amount)
-                new_level = self.calculate_level(new_xp)
-                await db.execute(
-                    'INSERT INTO levels (user_id, guild_id, xp, level) VALUES (?, ?, ?, ?)',
-                    (member.id, ctx.guild.id, new_xp, new_level)
-                )
-            
-            await db.commit()
-            
-            embed = discord.Embed(
-                title="✅ XP Updated",
-                description=f"{'Added' if amount > 0 else 'Removed'} {abs(amount)} XP {'to' if amount > 0 else 'from'} {member.mention}",
-                color=discord.Color.green()
-            )
-            await ctx.send(embed=embed)
+        await self.xp_buffer.adjust(member.id, ctx.guild.id, amount)
+        
+        embed = discord.Embed(
+            title="✅ XP Updated",
+            description=f"{'Added' if amount > 0 else 'Removed'} {abs(amount)} XP {'to' if amount > 0 else 'from'} {member.mention}",
+            color=discord.Color.green()
+        )
+        await ctx.send(embed=embed)
+    
+    async def _finish_bulk(self, ctx, affected, description):
+        self.ranks.invalidate(ctx.guild.id)
+        self.leaderboards.invalidate(ctx.guild.id)
+        
+        embed = discord.Embed(
+            title="✅ XP Updated",
+            description=description,
+            color=discord.Color.green()
+        )
+        embed.set_footer(text=f"{affected:,} members affected")
+        await ctx.send(embed=embed)
+    
+    @commands.command(name='givexprole')
+    @commands.has_permissions(administrator=True)
+    async def give_xp_role(self, ctx, role: discord.Role, amount: int):
+        """Give XP to every member of a role (Admin only)"""
+        user_ids = [member.id for member in await role_members(ctx.guild, role) if not member.bot]
+        if not user_ids:
+            await ctx.send(f"No members found in {role.mention}!")
+            return
+        
+        affected = await self.xp_buffer.bulk_add(ctx.guild.id, amount, user_ids)
+        await self._finish_bulk(ctx, affected, f"{'Added' if amount > 0 else 'Removed'} {abs(amount)} XP {'to' if amount > 0 else 'from'} members of {role.mention}")
+    
+    @commands.command(name='givexpusers')
+    @commands.has_permissions(administrator=True)
+    async def give_xp_users(self, ctx, amount: int, users: commands.Greedy[discord.Object]):
+        """Give XP to a list of user IDs or mentions (Admin only)"""
+        if not users:
+            await ctx.send("Provide at least one user ID or mention!")
+            return
+        
+        affected = await self.xp_buffer.bulk_add(ctx.guild.id, amount, [user.id for user in users])
+        await self._finish_bulk(ctx, affected, f"{'Added' if amount > 0 else 'Removed'} {abs(amount)} XP {'to' if amount > 0 else 'from'} {len(users)} users")
+    
+    @commands.command(name='givexpall')
+    @commands.has_permissions(administrator=True)
+    async def give_xp_all(self, ctx, amount: int):
+        """Give XP to every member who has XP in this server (Admin only)"""
+        affected = await self.xp_buffer.bulk_add(ctx.guild.id, amount)
+        await self._finish_bulk(ctx, affected, f"{'Added' if amount > 0 else 'Removed'} {abs(amount)} XP {'to' if amount > 0 else 'from'} everyone on the leaderboard")
+    
+    @commands.command(name='resetxp')
+    @commands.has_permissions(administrator=True)
+    async def reset_xp(self, ctx, confirm: str = None):
+        """Reset all XP and levels in this server (Admin only)"""
+        if confirm != "confirm":
+            await ctx.send(f"⚠️ This wipes every member's XP in this server. Run `{ctx.prefix}resetxp confirm` to continue.")
+            return
+        
+        affected = await self.xp_buffer.reset_guild(ctx.guild.id)
+        await self._finish_bulk(ctx, affected, "All XP and levels in this server have been reset")
+    
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        """Returning members show up on cached pages that skipped them"""
+        self.leaderboards.invalidate_member(member.guild.id, member.id)
+    
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        """Departed members drop off cached pages that list them"""
+        self.leaderboards.invalidate_member(member.guild.id, member.id)
+    
+    @commands.command(name='setxpcooldown')
+    @commands.has_permissions(administrator=True)
+    async def set_xp_cooldown(self, ctx, seconds: int):
+        """Set how often members can earn XP in this server (in seconds)"""
+        if seconds < 0 or seconds > 86400:
+            await ctx.send("Cooldown must be between 0 and 86400 seconds!")
+            return
+        
+        await self.bot.db.execute(
+            'INSERT INTO level_settings (guild_id, xp_cooldown) VALUES (?, ?) '
+            'ON CONFLICT (guild_id) DO UPDATE SET xp_cooldown = excluded.xp_cooldown',
+            (ctx.guild.id, seconds)
+        )
+        self.guild_cooldowns[ctx.guild.id] = seconds
+        
+        embed = discord.Embed(
+            title="✅ XP Cooldown Updated",
+            description=f"Members can now earn XP once every **{seconds}** seconds",
+            color=discord.Color.green()
+        )
+        await ctx.send(embed=embed)
 
 async def setup(bot):
-    cog = Levels(bot)
-    await cog.init_db()
-    await bot.add_cog(cog)
+    await bot.add_cog(Levels(bot))
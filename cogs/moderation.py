@@ -1,13 +1,32 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
+import asyncio
 import datetime
+import io
+import time
+import typing
+from utils.mass_actions import MassModerator, read_id_files, split_targets
+from utils.purge import PurgeFilter, PurgeFlags, PurgeJob
+
+MAX_PURGE = 10000
+MAX_SCAN = 50000
+# Messages scanned by default when filters are set, since not every message will match
+DEFAULT_FILTERED_SCAN = 2000
+MAX_MASS_TARGETS = 1000
+MAX_TIMEOUT_MINUTES = 28 * 1440
 
 class Moderation(commands.Cog):
     """Moderation commands for server management"""
     
     def __init__(self, bot):
         self.bot = bot
+        self.purges = {}   # channel_id -> running PurgeJob
+        self.mass = MassModerator(bot)
+    
+    async def cog_unload(self):
+        for job in self.purges.values():
+            job.cancel()
     
     @commands.command(name='kick')
     @commands.has_permissions(kick_members=True)
@@ -43,17 +62,119 @@ class Moderation(commands.Cog):
     @commands.has_permissions(ban_members=True)
     async def unban(self, ctx, user_id: int):
         """Unban a user from the server"""
-        user = await self.bot.fetch_user(user_id)
-        await ctx.guild.unban(user)
+        try:
+            # Unbanning only needs the ID, so there's no need to fetch the user first
+            await ctx.guild.unban(discord.Object(user_id))
+        except discord.NotFound:
+            await ctx.send(f"❌ User `{user_id}` is not banned!")
+            return
         embed = discord.Embed(
             title="Member Unbanned",
-            description=f"{user.mention} has been unbanned from the server.",
+            description=f"<@{user_id}> has been unbanned from the server.",
             color=discord.Color.green(),
             timestamp=datetime.datetime.now()
         )
         embed.add_field(name="Moderator", value=ctx.author.mention)
         await ctx.send(embed=embed)
     
+    @commands.command(name='massban')
+    @commands.has_permissions(ban_members=True)
+    @commands.bot_has_permissions(ban_members=True)
+    async def mass_ban(self, ctx, *, targets: str = ''):
+        """Ban many users by ID or mention, or from an attached .txt file, followed by an optional reason"""
+        await self._mass_action(ctx, "ban", "banned", targets, lambda ids, reason: self.mass.ban(
+            ctx.guild, ids, reason=reason, delete_message_seconds=86400
+        ))
+    
+    @commands.command(name='masskick')
+    @commands.has_permissions(kick_members=True)
+    @commands.bot_has_permissions(kick_members=True)
+    async def mass_kick(self, ctx, *, targets: str = ''):
+        """Kick many members by ID or mention, or from an attached .txt file, followed by an optional reason"""
+        await self._mass_action(ctx, "kick", "kicked", targets, lambda ids, reason: self.mass.kick(
+            ctx.guild, ids, reason=reason
+        ))
+    
+    @commands.command(name='masstimeout', aliases=['massmute'])
+    @commands.has_permissions(moderate_members=True)
+    @commands.bot_has_permissions(moderate_members=True)
+    async def mass_timeout(self, ctx, duration: int, *, targets: str = ''):
+        """Timeout many members for [duration] minutes by ID or mention, or from an attached .txt file"""
+        if duration < 1 or duration > MAX_TIMEOUT_MINUTES:
+            await ctx.send(f"❌ Timeouts can last from 1 minute up to {MAX_TIMEOUT_MINUTES // 1440} days!")
+            return
+        until = discord.utils.utcnow() + datetime.timedelta(minutes=duration)
+        await self._mass_action(ctx, f"timeout for {duration} minutes", "timed out", targets, lambda ids, reason: self.mass.timeout(
+            ctx.guild, ids, until, reason=reason
+        ))
+    
+    def _protected(self, ctx, user_id):
+        """Whether a mass action must leave this user alone"""
+        if user_id in (ctx.author.id, ctx.guild.owner_id, self.bot.user.id):
+            return True
+        # Only cached members are checked, so nobody has to be fetched
+        member = ctx.guild.get_member(user_id)
+        return member is not None and ctx.author.id != ctx.guild.owner_id and member.top_role >= ctx.author.top_role
+    
+    async def _mass_action(self, ctx, verb, done, targets, run):
+        typed_ids, reason = split_targets(targets)
+        file_ids, skipped_files = await read_id_files(ctx.message.attachments)
+        user_ids = list(dict.fromkeys(typed_ids + file_ids))
+        if not user_ids:
+            await ctx.send(f"❌ Give user IDs or mentions, or attach a .txt file of IDs: `{ctx.prefix}{ctx.invoked_with} <ids...> [reason]`")
+            return
+        if len(user_ids) > MAX_MASS_TARGETS:
+            await ctx.send(f"❌ You can only act on up to {MAX_MASS_TARGETS:,} users at once!")
+            return
+        
+        protected = [user_id for user_id in user_ids if self._protected(ctx, user_id)]
+        user_ids = [user_id for user_id in user_ids if user_id not in protected]
+        if not user_ids:
+            await ctx.send("❌ Every listed user is protected (you, the owner, the bot or someone at or above your top role)!")
+            return
+        
+        notes = [f"skipping {len(protected)} protected" if protected else None,
+                 f"ignoring {', '.join(skipped_files)}" if skipped_files else None]
+        notes = "; ".join(note for note in notes if note)
+        await ctx.send(
+            f"⚠️ About to {verb} **{len(user_ids):,}** users{f' ({notes})' if notes else ''}. "
+            f"Type `confirm` within 30 seconds to continue."
+        )
+        
+        def check(m):
+            return m.author == ctx.author and m.channel == ctx.channel and m.content.lower() == 'confirm'
+        
+        try:
+            await self.bot.wait_for('message', check=check, timeout=30.0)
+        except asyncio.TimeoutError:
+            await ctx.send("Cancelled, nothing was done.")
+            return
+        
+        audit_reason = f"Mass action by {ctx.author} ({ctx.author.id}): {reason or 'No reason provided'}"[:512]
+        started = time.monotonic()
+        async with ctx.typing():
+            result = await run(user_ids, audit_reason)
+        
+        embed = discord.Embed(
+            title=f"Mass {verb.split()[0].capitalize()} Finished",
+            description=f"✅ {len(result.succeeded):,} {done} • ❌ {result.failed_count:,} failed • ⏭️ {len(protected):,} protected",
+            color=discord.Color.red() if not result.failed else discord.Color.orange(),
+            timestamp=datetime.datetime.now()
+        )
+        for failure, ids in result.failed.items():
+            shown = ", ".join(str(user_id) for user_id in ids[:5])
+            embed.add_field(name=f"{failure.capitalize()} ({len(ids):,})", value=shown + (f" +{len(ids) - 5:,} more" if len(ids) > 5 else ""), inline=False)
+        embed.add_field(name="Reason", value=reason or "No reason provided", inline=True)
+        embed.add_field(name="Moderator", value=ctx.author.mention, inline=True)
+        embed.set_footer(text=f"Took {time.monotonic() - started:.1f}s")
+        
+        # The full list of failures goes in a file rather than a huge embed
+        file = None
+        if result.failed_count > 5:
+            lines = [f"{user_id} {failure}" for failure, ids in result.failed.items() for user_id in ids]
+            file = discord.File(io.BytesIO("\n".join(lines).encode()), filename="failed.txt")
+        await ctx.send(embed=embed, file=file)
+    
     @commands.command(name='mute')
     @commands.has_permissions(moderate_members=True)
     async def mute(self, ctx, member: discord.Member, duration: int = 60, *, reason=None):
@@ -110,20 +231,90 @@ class Moderation(commands.Cog):
         except:
             pass
     
-    @commands.command(name='clear')
+    @commands.command(name='clear', aliases=['purge'])
     @commands.has_permissions(manage_messages=True)
-    async def clear(self, ctx, amount: int = 10):
-        """Delete a specified number of messages"""
-        deleted = await ctx.channel.purge(limit=amount + 1)
+    @commands.bot_has_permissions(manage_messages=True, read_message_history=True)
+    async def clear(self, ctx, amount: typing.Optional[int] = 10, *, filters: PurgeFlags):
+        """Delete up to [amount] messages, optionally filtered by user:, bots:, regex:, attachments:, links:, since: or until:"""
+        if amount < 1 or amount > MAX_PURGE:
+            await ctx.send(f"❌ Amount must be between 1 and {MAX_PURGE:,}!")
+            return
+        
+        if ctx.channel.id in self.purges:
+            await ctx.send(f"⏳ A purge is already running here. Stop it with `{ctx.prefix}cancelclear`.")
+            return
+        
+        purge_filter = PurgeFilter.from_flags(filters)
+        scan_limit = filters.scan or (DEFAULT_FILTERED_SCAN if purge_filter.active else amount)
+        now = discord.utils.utcnow()
+        job = PurgeJob(
+            ctx.channel,
+            limit=amount,
+            scan_limit=min(max(scan_limit, amount), MAX_SCAN),
+            purge_filter=purge_filter,
+            # Starting below the command also keeps the progress message out of the scan
+            before=discord.Object(discord.utils.time_snowflake(now - filters.until)) if filters.until else ctx.message,
+            since=now - filters.since if filters.since else None
+        )
+        
+        self.purges[ctx.channel.id] = job
+        try:
+            try:
+                await ctx.message.delete()
+            except discord.HTTPException:
+                pass
+            status = await ctx.send(embed=self._purge_embed(ctx, job))
+            
+            async def progress(job):
+                try:
+                    await status.edit(embed=self._purge_embed(ctx, job))
+                except discord.HTTPException:
+                    pass
+            
+            await job.run(progress=progress)
+        finally:
+            self.purges.pop(ctx.channel.id, None)
+        
+        try:
+            await status.edit(embed=self._purge_embed(ctx, job))
+            await status.delete(delay=10)
+        except discord.HTTPException:
+            pass
+    
+    @commands.command(name='cancelclear')
+    @commands.has_permissions(manage_messages=True)
+    async def cancel_clear(self, ctx):
+        """Stop the purge running in this channel"""
+        job = self.purges.get(ctx.channel.id)
+        if job is None:
+            await ctx.send("No purge is running in this channel!")
+            return
+        job.cancel()
+        await ctx.send(f"🛑 Stopping the purge after {job.deleted:,} deleted messages", delete_after=10)
+    
+    def _purge_embed(self, ctx, job):
+        if job.finished is None:
+            title, color = "🧹 Clearing Messages...", discord.Color.orange()
+        elif job.cancelled:
+            title, color = "🛑 Clear Cancelled", discord.Color.dark_grey()
+        else:
+            title, color = "Messages Cleared", discord.Color.red()
+        
+        elapsed = (job.finished or time.monotonic()) - job.started
         embed = discord.Embed(
-            title="Messages Cleared",
-            description=f"Deleted {len(deleted) - 1} messages.",
-            color=discord.Color.red(),
+            title=title,
+            description=f"Deleted {job.deleted:,} of {job.limit:,} messages after scanning {job.scanned:,}.",
+            color=color,
             timestamp=datetime.datetime.now()
         )
-        embed.add_field(name="Moderator", value=ctx.author.mention)
-        msg = await ctx.send(embed=embed)
-        await msg.delete(delay=5)
+        embed.add_field(name="Filter", value=job.filter.describe(), inline=False)
+        if job.single_deleted:
+            embed.add_field(name="Older Than 14 Days", value=f"{job.single_deleted:,} deleted one by one", inline=True)
+        if job.failed:
+            embed.add_field(name="Failed", value=f"{job.failed:,}", inline=True)
+        embed.add_field(name="Moderator", value=ctx.author.mention, inline=True)
+        embed.set_footer(text=f"{elapsed:.0f}s elapsed")
+        return embed
     
     @commands.command(name='slowmode')
     @commands.has_permissions(manage_channels=True)
@@ -10,6 +10,14 @@ class Music(commands.Cog):
         self.queue = {}
         self.now_playing = {}
     
+    def export_state(self):
+        """Queues to carry over when the extension is reloaded"""
+        return {'queue': self.queue, 'now_playing': self.now_playing}
+    
+    def import_state(self, state):
+        self.queue = state['queue']
+        self.now_playing = state['now_playing']
+    
     @commands.command(name='join')
     async def join(self, ctx):
         """Join the voice channel"""
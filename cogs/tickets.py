@@ -10,6 +10,14 @@ class Tickets(commands.Cog):
         self.ticket_category = None
         self.ticket_counter = {}
     
+    def export_state(self):
+        """Ticket numbering to carry over when the extension is reloaded"""
+        return {'ticket_category': self.ticket_category, 'ticket_counter': self.ticket_counter}
+    
+    def import_state(self, state):
+        self.ticket_category = state['ticket_category']
+        self.ticket_counter = state['ticket_counter']
+    
     @commands.command(name='setuptickets')
     @commands.has_permissions(administrator=True)
     async def setup_tickets(self, ctx, category: discord.CategoryChannel = None):
@@ -2,13 +2,21 @@ import discord
 from discord.ext import commands
 import datetime
 import platform
-import psutil
+import typing
+from utils.cache_policy import role_members
+from utils.embed_cache import EmbedCache
+from utils.polls import MAX_OPTIONS
+
+MAX_REMINDERS_PER_USER = 25
+MAX_REMINDER_SECONDS = 365 * 86400
+MAX_POLL_MINUTES = 30 * 1440
 
 class Utility(commands.Cog):
     """Utility commands for information and tools"""
     
     def __init__(self, bot):
         self.bot = bot
+        self.embeds = EmbedCache()
     
     @commands.command(name='userinfo', aliases=['ui', 'whois'])
     async def userinfo(self, ctx, member: discord.Member = None):
@@ -57,7 +65,7 @@ class Utility(commands.Cog):
             embed.set_thumbnail(url=guild.icon.url)
         
         embed.add_field(name="ID", value=guild.id, inline=True)
-        embed.add_field(name="Owner", value=guild.owner.mention, inline=True)
+        embed.add_field(name="Owner", value=f"<@{guild.owner_id}>", inline=True)
         embed.add_field(name="Region", value=str(guild.preferred_locale), inline=True)
         
         embed.add_field(name="Members", value=guild.member_count, inline=True)
@@ -98,6 +106,9 @@ class Utility(commands.Cog):
     @commands.command(name='roleinfo')
     async def roleinfo(self, ctx, *, role: discord.Role):
         """Get information about a role"""
+        async with ctx.typing():
+            members = await role_members(ctx.guild, role)
+        
         embed = discord.Embed(
             title=f"Role Info - {role.name}",
             color=role.color
@@ -109,7 +120,7 @@ class Utility(commands.Cog):
         
         embed.add_field(name="Mentionable", value="Yes" if role.mentionable else "No", inline=True)
         embed.add_field(name="Hoisted", value="Yes" if role.hoist else "No", inline=True)
-        embed.add_field(name="Members", value=len(role.members), inline=True)
+        embed.add_field(name="Members", value=len(members), inline=True)
         
         embed.add_field(
             name="Created",
@@ -151,6 +162,7 @@ class Utility(commands.Cog):
     @commands.command(name='botinfo')
     async def botinfo(self, ctx):
         """Get information about the bot"""
+        totals = await self.bot.cluster.totals()
         embed = discord.Embed(
             title=f"{self.bot.user.name} - Bot Information",
             color=discord.Color.red(),
@@ -158,73 +170,120 @@ class Utility(commands.Cog):
         )
         embed.set_thumbnail(url=self.bot.user.display_avatar.url)
         
-        embed.add_field(name="Servers", value=len(self.bot.guilds), inline=True)
-        embed.add_field(name="Users", value=len(self.bot.users), inline=True)
+        embed.add_field(name="Servers", value=totals['guilds'], inline=True)
+        embed.add_field(name="Users", value=totals['users'], inline=True)
         embed.add_field(name="Commands", value=len(self.bot.commands), inline=True)
         
         embed.add_field(name="Python Version", value=platform.python_version(), inline=True)
         embed.add_field(name="Discord.py Version", value=discord.__version__, inline=True)
-        embed.add_field(name="Latency", value=f"{round(self.bot.latency * 1000)}ms", inline=True)
+        embed.add_field(name="Latency", value=f"{round(totals['latency'] * 1000)}ms", inline=True)
+        
+        if self.bot.cluster.clustered:
+            embed.add_field(name="Shards", value=totals['shards'], inline=True)
+            embed.add_field(name="Clusters", value=totals['clusters'], inline=True)
+            embed.add_field(name="This Cluster", value=self.bot.cluster.cluster_id, inline=True)
         
-        # System info
-        cpu_usage = psutil.cpu_percent()
-        ram = psutil.virtual_memory()
-        embed.add_field(name="CPU Usage", value=f"{cpu_usage}%", inline=True)
-        embed.add_field(name="RAM Usage", value=f"{ram.percent}%", inline=True)
+        # Process health comes from the background sampler rather than system calls here
+        health = self.bot.health.latest()
+        if health:
+            embed.add_field(name="CPU Usage", value=f"{health.cpu:.1f}%", inline=True)
+            embed.add_field(name="Memory", value=f"{health.rss / 1024 / 1024:.0f} MB", inline=True)
+            embed.add_field(name="Loop Lag", value=f"{health.lag * 1000:.0f}ms", inline=True)
         
         await ctx.send(embed=embed)
     
     @commands.command(name='invite')
     async def invite(self, ctx):
         """Get the bot's invite link"""
-        embed = discord.Embed(
+        await ctx.send(embed=self.embeds.get('invite', self._invite_embed))
+    
+    def _invite_embed(self):
+        return discord.Embed(
             title="Invite Me!",
             description=f"Click [here](https://discord.com/api/oauth2/authorize?client_id={self.bot.user.id}&permissions=8&scope=bot%20applications.commands) to invite me to your server!",
             color=discord.Color.red()
         )
-        await ctx.send(embed=embed)
     
     @commands.command(name='poll')
-    async def poll(self, ctx, question, *options):
-        """Create a poll with up to 10 options"""
-        if len(options) > 10:
-            await ctx.send("You can only have up to 10 options!")
+    async def poll(self, ctx, minutes: typing.Optional[int], question, *options):
+        """Create a button poll with up to 10 options (optionally lasting [minutes], default 1 day)"""
+        if len(options) > MAX_OPTIONS:
+            await ctx.send(f"You can only have up to {MAX_OPTIONS} options!")
             return
         
         if len(options) < 2:
             await ctx.send("You need at least 2 options!")
             return
         
-        reactions = ['1️⃣', '2️⃣', '3️⃣', '4️⃣', '5️⃣', '6️⃣', '7️⃣', '8️⃣', '9️⃣', '🔟']
-        
-        description = []
-        for idx, option in enumerate(options):
-            description.append(f"{reactions[idx]} {option}")
+        minutes = minutes or 1440
+        if minutes < 1 or minutes > MAX_POLL_MINUTES:
+            await ctx.send(f"Polls can run for 1 minute up to {MAX_POLL_MINUTES // 1440} days!")
+            return
         
-        embed = discord.Embed(
-            title=f"📊 {question}",
-            description="\n".join(description),
-            color=discord.Color.red()
-        )
-        embed.set_footer(text=f"Poll by {ctx.author}")
+        await self.bot.polls.create(ctx.channel, ctx.author, question, options, minutes * 60)
+    
+    @commands.command(name='endpoll')
+    async def end_poll(self, ctx, message_id: int):
+        """End a poll early and show the final results (poll author or Manage Messages)"""
+        poll = self.bot.polls.polls.get(message_id)
+        if poll is None:
+            await ctx.send("That poll is not running!")
+            return
         
-        poll_msg = await ctx.send(embed=embed)
+        if poll.author_id != ctx.author.id and not ctx.channel.permissions_for(ctx.author).manage_messages:
+            await ctx.send("❌ Only the poll's author or a moderator can end it!")
+            return
         
-        for idx in range(len(options)):
-            await poll_msg.add_reaction(reactions[idx])
+        await self.bot.polls.end(message_id)
+        await ctx.send("✅ Poll ended", delete_after=5)
     
-    @commands.command(name='reminder')
+    @commands.command(name='reminder', aliases=['remind'])
     async def reminder(self, ctx, time: int, *, message):
         """Set a reminder (time in seconds)"""
-        await ctx.send(f"✅ Reminder set for {time} seconds from now!")
-        await discord.utils.sleep_until(discord.utils.utcnow() + discord.timedelta(seconds=time))
+        if time < 1 or time > MAX_REMINDER_SECONDS:
+            await ctx.send(f"Reminders must be between 1 second and {MAX_REMINDER_SECONDS // 86400} days away!")
+            return
+        
+        if await self.bot.reminders.count_for_user(ctx.author.id) >= MAX_REMINDERS_PER_USER:
+            await ctx.send(f"You already have {MAX_REMINDERS_PER_USER} pending reminders! Cancel one with `{ctx.prefix}cancelreminder <id>`.")
+            return
+        
+        due_at = datetime.datetime.now(datetime.timezone.utc).timestamp() + time
+        reminder_id = await self.bot.reminders.add(
+            ctx.author.id,
+            ctx.guild.id if ctx.guild else None,
+            ctx.channel.id,
+            message[:2000],
+            due_at
+        )
+        await ctx.send(f"✅ Reminder #{reminder_id} set for <t:{int(due_at)}:R>!")
+    
+    @commands.command(name='reminders')
+    async def reminders(self, ctx):
+        """List your pending reminders"""
+        rows = await self.bot.reminders.for_user(ctx.author.id)
+        if not rows:
+            await ctx.send("You have no pending reminders!")
+            return
         
         embed = discord.Embed(
-            title="⏰ Reminder!",
-            description=message,
+            title="⏰ Your Reminders",
+            description="\n".join(
+                f"**#{reminder_id}** <t:{int(due_at)}:R> in <#{channel_id}> - {message[:80]}"
+                for reminder_id, channel_id, message, due_at in rows
+            ),
             color=discord.Color.red()
         )
-        await ctx.send(f"{ctx.author.mention}", embed=embed)
+        embed.set_footer(text=f"Cancel one with {ctx.prefix}cancelreminder <id>")
+        await ctx.send(embed=embed)
+    
+    @commands.command(name='cancelreminder')
+    async def cancel_reminder(self, ctx, reminder_id: int):
+        """Cancel one of your reminders"""
+        if await self.bot.reminders.cancel(ctx.author.id, reminder_id):
+            await ctx.send(f"✅ Cancelled reminder #{reminder_id}")
+        else:
+            await ctx.send(f"You don't have a reminder #{reminder_id}!")
 
 async def setup(bot):
     await bot.add_cog(Utility(bot))
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import sys
+import time
+import discord
+
+MEMBER_CACHE_FLAGS = ('joined', 'voice')
+# How long a member list fetched for a partially cached guild is reused
+MEMBER_LIST_TTL = 120.0
+
+_member_lists = {}   # guild_id -> (fetched_at, task fetching the member list)
+
+def cache_options(intents):
+    """Client cache options built from MEMORY_BUDGET, MEMBER_CACHE, CHUNK_GUILDS and MAX_MESSAGES"""
+    budget = os.getenv('MEMORY_BUDGET', '').lower() == 'true'
+    member_cache = os.getenv('MEMBER_CACHE', 'voice' if budget else 'all').lower()
+    
+    if member_cache == 'all':
+        flags = discord.MemberCacheFlags.from_intents(intents)
+    elif member_cache == 'none':
+        flags = discord.MemberCacheFlags.none()
+    else:
+        names = {name.strip() for name in member_cache.split(',') if name.strip()}
+        unknown = names - set(MEMBER_CACHE_FLAGS)
+        if unknown:
+            raise ValueError(f'Unknown MEMBER_CACHE flags: {", ".join(sorted(unknown))}')
+        flags = discord.MemberCacheFlags(**{name: name in names for name in MEMBER_CACHE_FLAGS})
+    
+    chunk = os.getenv('CHUNK_GUILDS')
+    max_messages = os.getenv('MAX_MESSAGES')
+    return {
+        'member_cache_flags': flags,
+        'chunk_guilds_at_startup': (chunk.lower() == 'true') if chunk else not budget,
+        'max_messages': (int(max_messages) or None) if max_messages else (200 if budget else 1000),
+    }
+
+def has_full_member_list(guild):
+    """Whether the guild's member cache is complete enough to answer membership questions"""
+    return guild.chunked
+
+async def guild_members(guild):
+    """Every member of a guild, fetched without caching (and reused briefly) if the cache is partial"""
+    if has_full_member_list(guild):
+        return guild.members
+    
+    now = time.monotonic()
+    for guild_id, (fetched_at, task) in list(_member_lists.items()):
+        if task.done() and now - fetched_at > MEMBER_LIST_TTL:
+            del _member_lists[guild_id]
+    
+    entry = _member_lists.get(guild.id)
+    if entry is None:
+        entry = _member_lists[guild.id] = (now, asyncio.ensure_future(guild.chunk(cache=False)))
+    try:
+        # Shielded so one caller giving up doesn't cancel the request for everyone else
+        return await asyncio.shield(entry[1])
+    except Exception:
+        if _member_lists.get(guild.id) is entry:
+            del _member_lists[guild.id]
+        raise
+
+async def role_members(guild, role):
+    """Members holding a role, fetched lazily when the member cache is partial"""
+    if has_full_member_list(guild):
+        return role.members
+    return [member for member in await guild_members(guild) if role in member.roles]
+
+def deep_sizeof(obj, seen=None):
+    """Approximate bytes held by an object and everything it references"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen or isinstance(obj, (type, discord.Client)):
+        return 0
+    seen.add(id(obj))
+    
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    else:
+        for slot in getattr(type(obj), '__slots__', ()):
+            if hasattr(obj, slot) and slot not in ('_state', 'guild'):
+                size += deep_sizeof(getattr(obj, slot), seen)
+        if hasattr(obj, '__dict__'):
+            size += deep_sizeof(vars(obj), seen)
+    return size
+
+def guild_memory_report(bot, limit=10, sample=25):
+    """Estimated cache memory for the guilds holding the most members, largest first"""
+    report = []
+    for guild in sorted(bot.guilds, key=lambda g: len(g._members), reverse=True)[:limit]:
+        members = list(guild._members.values())
+        sampled = members[:sample]
+        per_member = sum(deep_sizeof(member) for member in sampled) / len(sampled) if sampled else 0
+        channels = sum(sys.getsizeof(channel) for channel in guild.channels)
+        report.append({
+            'guild': guild,
+            'members_cached': len(members),
+            'member_count': guild.member_count or 0,
+            'chunked': guild.chunked,
+            'bytes': int(per_member * len(members)) + channels,
+        })
+    return report
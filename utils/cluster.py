@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+def owns_guild(bot, guild_id):
+    """Whether this process runs the shard for a guild (cluster 0 also owns DMs, guild_id None)"""
+    shard_ids = getattr(bot, 'shard_ids', None)
+    if not shard_ids:
+        return True
+    if guild_id is None:
+        return 0 in shard_ids
+    return (guild_id >> 22) % bot.shard_count in shard_ids
+
+class ClusterStats:
+    """Shares per-cluster stats through the database so any cluster can report totals"""
+    
+    def __init__(self, bot, cluster_id=None, interval=30.0):
+        self.bot = bot
+        self.cluster_id = cluster_id
+        self.interval = interval
+        self._task = None
+    
+    @property
+    def clustered(self):
+        """Whether this process is one of several clusters"""
+        return self.cluster_id is not None
+    
+    def local(self):
+        """Stats for this process only"""
+        return {
+            'guilds': len(self.bot.guilds),
+            'users': len(self.bot.users),
+            'latency': self.bot.latency,
+            'shards': len(self.bot.shards) if hasattr(self.bot, 'shards') else 1,
+            'clusters': 1,
+        }
+    
+    def start(self):
+        """Start publishing this cluster's stats"""
+        if self.clustered and self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def close(self):
+        """Stop publishing and remove this cluster's row"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self.clustered:
+            await self.bot.db.execute('DELETE FROM cluster_stats WHERE cluster_id = ?', (self.cluster_id,))
+    
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                await self.publish()
+            except Exception as e:
+                log.exception('Failed to publish cluster stats: %s', e)
+            await asyncio.sleep(self.interval)
+    
+    async def publish(self):
+        """Write this cluster's current stats"""
+        stats = self.local()
+        shard_ids = ','.join(map(str, sorted(self.bot.shards))) if hasattr(self.bot, 'shards') else ''
+        await self.bot.db.execute(
+            'INSERT INTO cluster_stats (cluster_id, shard_ids, guilds, users, latency, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT (cluster_id) DO UPDATE SET shard_ids = excluded.shard_ids, guilds = excluded.guilds, '
+            'users = excluded.users, latency = excluded.latency, updated_at = excluded.updated_at',
+            (self.cluster_id, shard_ids, stats['guilds'], stats['users'], stats['latency'], time.time())
+        )
+    
+    async def totals(self):
+        """Stats summed over every live cluster (or local stats when not clustered)"""
+        if not self.clustered:
+            return self.local()
+        
+        row = await self.bot.db.fetchone(
+            'SELECT COUNT(*), SUM(guilds), SUM(users), AVG(latency), '
+            "SUM(LENGTH(shard_ids) - LENGTH(REPLACE(shard_ids, ',', '')) + (shard_ids != '')) "
+            'FROM cluster_stats WHERE updated_at > ?',
+            (time.time() - self.interval * 3,)
+        )
+        clusters, guilds, users, latency, shards = row
+        if not clusters:
+            return self.local()
+        return {
+            'guilds': guilds,
+            'users': users,
+            'latency': latency or 0.0,
+            'shards': shards,
+            'clusters': clusters,
+        }
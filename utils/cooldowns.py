@@ -0,0 +1,46 @@
+import time
+
+class CooldownMap:
+    """Expiry-time cooldowns keyed by any hashable"""
+    
+    def __init__(self, sweep_interval=30.0):
+        self.sweep_interval = sweep_interval
+        self.expiries = {}
+        self._next_sweep = time.monotonic() + sweep_interval
+    
+    def __len__(self):
+        return len(self.expiries)
+    
+    def __contains__(self, key):
+        return self.remaining(key) > 0
+    
+    def remaining(self, key, now=None):
+        """Seconds left on the key's cooldown, or 0 if it is not cooling down"""
+        expiry = self.expiries.get(key)
+        if expiry is None:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        return max(0.0, expiry - now)
+    
+    def try_acquire(self, key, seconds):
+        """Start a cooldown unless one is running; return True if it was started"""
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self.sweep(now)
+        
+        expiry = self.expiries.get(key)
+        if expiry is not None and expiry > now:
+            return False
+        
+        self.expiries[key] = now + seconds
+        return True
+    
+    def reset(self, key):
+        """End a key's cooldown early"""
+        self.expiries.pop(key, None)
+    
+    def sweep(self, now=None):
+        """Drop every expired key"""
+        now = time.monotonic() if now is None else now
+        self.expiries = {key: expiry for key, expiry in self.expiries.items() if expiry > now}
+        self._next_sweep = now + self.sweep_interval
@@ -0,0 +1,107 @@
+import asyncio
+import contextlib
+import aiosqlite
+
+PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA foreign_keys = ON',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -16000',
+    'PRAGMA mmap_size = 134217728',
+    'PRAGMA busy_timeout = 5000',
+)
+
+class Database:
+    """Long-lived SQLite service shared by the bot and every cog"""
+    
+    def __init__(self, path, readers=3, cached_statements=256):
+        self.path = path
+        self.reader_count = max(1, readers)
+        self.cached_statements = cached_statements
+        
+        self._writer = None
+        self._write_lock = asyncio.Lock()
+        self._readers = asyncio.Queue()
+        self._all = []
+        self._connect_lock = asyncio.Lock()
+    
+    @property
+    def connected(self):
+        """Whether the pool is open"""
+        return self._writer is not None
+    
+    async def _open(self):
+        conn = await aiosqlite.connect(self.path, cached_statements=self.cached_statements)
+        for pragma in PRAGMAS:
+            await conn.execute(pragma)
+        self._all.append(conn)
+        return conn
+    
+    async def connect(self):
+        """Open the pool (no-op if it is already open)"""
+        async with self._connect_lock:
+            if self.connected:
+                return
+            
+            self._writer = await self._open()
+            for _ in range(self.reader_count):
+                self._readers.put_nowait(await self._open())
+    
+    async def close(self):
+        """Close every pooled connection"""
+        async with self._connect_lock:
+            for conn in self._all:
+                await conn.close()
+            self._all.clear()
+            self._writer = None
+            self._readers = asyncio.Queue()
+    
+    @contextlib.asynccontextmanager
+    async def reader(self):
+        """Borrow a read-only connection from the pool"""
+        conn = await self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
+    
+    @contextlib.asynccontextmanager
+    async def transaction(self):
+        """Run several statements on the writer as one atomic transaction"""
+        async with self._write_lock:
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.rollback()
+                raise
+            else:
+                await self._writer.commit()
+    
+    async def fetchone(self, query, params=()):
+        """Return the first row of a read query, or None"""
+        async with self.reader() as conn:
+            async with conn.execute(query, params) as cursor:
+                return await cursor.fetchone()
+    
+    async def fetchall(self, query, params=()):
+        """Return every row of a read query"""
+        async with self.reader() as conn:
+            async with conn.execute(query, params) as cursor:
+                return await cursor.fetchall()
+    
+    async def fetchval(self, query, params=(), default=None):
+        """Return the first column of the first row, or default"""
+        row = await self.fetchone(query, params)
+        return row[0] if row else default
+    
+    async def execute(self, query, params=()):
+        """Run a single write statement and commit it, returning the row count"""
+        async with self.transaction() as conn:
+            async with conn.execute(query, params) as cursor:
+                return cursor.rowcount
+    
+    async def executemany(self, query, rows):
+        """Run a write statement for every row in one transaction"""
+        async with self.transaction() as conn:
+            await conn.executemany(query, rows)
@@ -0,0 +1,38 @@
+import time
+
+class EmbedCache:
+    """Embeds built once and reused until they expire or the cache is cleared"""
+    
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self.entries = {}   # key -> (built_at, embed)
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def get(self, key, build, ttl=None):
+        entry = self.entries.get(key)
+        now = time.monotonic()
+        if entry is not None and (ttl is None or now - entry[0] < ttl):
+            return entry[1]
+        embed = build()
+        self._store(key, now, embed)
+        return embed
+    
+    async def get_async(self, key, build, ttl=None):
+        """Like get, for builders that need to await (e.g. a database query)"""
+        entry = self.entries.get(key)
+        now = time.monotonic()
+        if entry is not None and (ttl is None or now - entry[0] < ttl):
+            return entry[1]
+        embed = await build()
+        self._store(key, now, embed)
+        return embed
+    
+    def _store(self, key, now, embed):
+        if len(self.entries) >= self.max_entries:
+            self.entries.clear()
+        self.entries[key] = (now, embed)
+    
+    def clear(self):
+        self.entries.clear()
@@ -0,0 +1,105 @@
+import asyncio
+import collections
+import logging
+import math
+import time
+import psutil
+
+log = logging.getLogger(__name__)
+
+SPARK = '▁▂▃▄▅▆▇█'
+
+class Sample:
+    """One reading of the process's health"""
+    
+    __slots__ = ('at', 'cpu', 'rss', 'lag', 'tasks', 'latency')
+    
+    def __init__(self, at, cpu, rss, lag, tasks, latency):
+        self.at = at
+        self.cpu = cpu            # process CPU % over the last interval (can exceed 100 on several cores)
+        self.rss = rss            # resident memory in bytes
+        self.lag = lag            # worst event loop delay seen during the interval, in seconds
+        self.tasks = tasks
+        self.latency = latency    # gateway heartbeat latency in seconds, None before the first heartbeat
+
+class HealthSampler:
+    """Background sampler keeping recent health readings in a ring buffer"""
+    
+    def __init__(self, bot, interval=5.0, size=720, probe=0.5):
+        self.bot = bot
+        self.interval = interval
+        self.probe = probe
+        self.samples = collections.deque(maxlen=size)
+        self.process = psutil.Process()
+        self._task = None
+    
+    def start(self):
+        if self._task is None:
+            self.process.cpu_percent(None)   # the first reading only sets the baseline
+            self._task = asyncio.create_task(self._run())
+    
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+    
+    def latest(self):
+        """The most recent sample, or None before the first one"""
+        return self.samples[-1] if self.samples else None
+    
+    def window(self, seconds):
+        """Samples from the last `seconds` seconds, oldest first"""
+        since = time.monotonic() - seconds
+        recent = []
+        for sample in reversed(self.samples):
+            if sample.at < since:
+                break
+            recent.append(sample)
+        recent.reverse()
+        return recent
+    
+    def summary(self, field, seconds):
+        """(average, maximum) of a field over the last `seconds`, or None without data"""
+        values = [value for value in (getattr(sample, field) for sample in self.window(seconds)) if value is not None]
+        if not values:
+            return None
+        return sum(values) / len(values), max(values)
+    
+    def sparkline(self, field, seconds, width=24):
+        """A small text chart of a field over the last `seconds`"""
+        values = [getattr(sample, field) for sample in self.window(seconds)]
+        values = [value for value in values if value is not None]
+        if not values:
+            return ''
+        # Average into at most `width` buckets
+        step = max(1, math.ceil(len(values) / width))
+        points = [sum(values[i:i + step]) / len(values[i:i + step]) for i in range(0, len(values), step)]
+        low, high = min(points), max(points)
+        span = (high - low) or 1
+        return ''.join(SPARK[min(len(SPARK) - 1, int((point - low) / span * len(SPARK)))] for point in points)
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            worst_lag = 0.0
+            deadline = loop.time() + self.interval
+            while loop.time() < deadline:
+                expected = loop.time() + self.probe
+                await asyncio.sleep(self.probe)
+                worst_lag = max(worst_lag, loop.time() - expected)
+            
+            try:
+                self.samples.append(self._sample(worst_lag))
+            except psutil.Error as e:
+                log.warning('Failed to sample process health: %s', e)
+    
+    def _sample(self, lag):
+        latency = self.bot.latency
+        return Sample(
+            at=time.monotonic(),
+            cpu=self.process.cpu_percent(None),
+            rss=self.process.memory_info().rss,
+            lag=lag,
+            tasks=len(asyncio.all_tasks()),
+            latency=latency if math.isfinite(latency) else None,
+        )
@@ -0,0 +1,86 @@
+import difflib
+import discord
+from utils.embed_cache import EmbedCache
+
+class HelpIndex:
+    """Command lookup table and help embeds, built once per set of loaded extensions"""
+    
+    def __init__(self, bot, per_section=10):
+        self.bot = bot
+        self.per_section = per_section
+        self.table = None       # lowercase name or alias -> command
+        self.names = []
+        self.sections = []      # (cog name, [command names])
+        self.total = 0
+        self.embeds = EmbedCache()
+    
+    def invalidate(self):
+        self.table = None
+        self.embeds.clear()
+    
+    def _build(self):
+        table = {}
+        for command in self.bot.walk_commands():
+            for name in (command.qualified_name, *(f'{command.full_parent_name} {alias}'.strip() for alias in command.aliases)):
+                table.setdefault(name.lower(), command)
+        
+        self.sections = []
+        for cog_name, cog in self.bot.cogs.items():
+            names = [command.name for command in cog.get_commands() if not command.hidden]
+            if names:
+                self.sections.append((cog_name, names))
+        
+        self.table = table
+        self.names = list(table)
+        self.total = len(self.bot.commands)
+    
+    def find(self, name):
+        """Return (command, suggestions); command is None if nothing matches exactly"""
+        if self.table is None:
+            self._build()
+        name = ' '.join(name.lower().split())
+        command = self.table.get(name)
+        if command is not None:
+            return command, []
+        return None, difflib.get_close_matches(name, self.names, n=3, cutoff=0.6)
+    
+    def overview(self, prefix):
+        """The command list embed for a prefix"""
+        if self.table is None:
+            self._build()
+        return self.embeds.get(('overview', prefix), lambda: self._overview(prefix))
+    
+    def command_help(self, command, prefix):
+        """The help embed for one command and prefix"""
+        return self.embeds.get(('command', command.qualified_name, prefix), lambda: self._command_help(command, prefix))
+    
+    def _overview(self, prefix):
+        embed = discord.Embed(
+            title="📚 Bot Commands",
+            description=f"Use `{prefix}help <command>` for more info on a command",
+            color=discord.Color.red()
+        )
+        for cog_name, names in self.sections:
+            embed.add_field(
+                name=f"**{cog_name}**",
+                value=", ".join(f"`{name}`" for name in names[:self.per_section]),
+                inline=False
+            )
+        embed.set_footer(text=f"Total Commands: {self.total}")
+        return embed
+    
+    def _command_help(self, command, prefix):
+        embed = discord.Embed(
+            title=f"Help - {command.qualified_name}",
+            description=command.help or "No description available",
+            color=discord.Color.red()
+        )
+        
+        if command.aliases:
+            embed.add_field(name="Aliases", value=", ".join(command.aliases), inline=False)
+        
+        usage = f"{prefix}{command.qualified_name}"
+        if command.signature:
+            usage += f" {command.signature}"
+        embed.add_field(name="Usage", value=f"`{usage}`", inline=False)
+        return embed
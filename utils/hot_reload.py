@@ -0,0 +1,18 @@
+async def reload_with_state(bot, name):
+    """Reload an extension, passing its cogs' export_state() to import_state() on the new instances"""
+    states = {
+        cog_name: cog.export_state()
+        for cog_name, cog in bot.cogs.items()
+        if cog.__module__ == name and hasattr(cog, 'export_state')
+    }
+    
+    try:
+        await bot.reload_extension(name)
+    finally:
+        restored = []
+        for cog_name, state in states.items():
+            cog = bot.get_cog(cog_name)
+            if cog is not None and hasattr(cog, 'import_state'):
+                cog.import_state(state)
+                restored.append(cog_name)
+    return restored
@@ -0,0 +1,173 @@
+import asyncio
+import collections
+import logging
+import time
+import discord
+from utils.cache_policy import has_full_member_list
+from utils.ratelimit import TokenBucket
+
+log = logging.getLogger(__name__)
+
+class JoinPipeline:
+    """Queues member joins per guild so raids do not stampede the API"""
+    
+    def __init__(self, bot, window=3.0, workers=2, role_rate=5, role_per=5.0, mention_limit=30):
+        self.bot = bot
+        self.window = window
+        self.worker_count = workers
+        self.role_rate = role_rate
+        self.role_per = role_per
+        self.mention_limit = mention_limit
+        
+        self.welcomes = {}      # guild_id -> members waiting for the next announcement
+        self.windows = {}       # guild_id -> task announcing that guild's joins
+        self.roles = {}         # guild_id -> deque of (member, role_id, queued_at)
+        self.ready = asyncio.Queue()   # guilds with roles to assign, each queued at most once
+        self.parked = {}        # guild_id -> timer re-queueing a guild once its bucket refills
+        self.buckets = {}       # guild_id -> TokenBucket pacing role assignments
+        self.workers = []
+        
+        self.roles_assigned = 0
+        self.roles_failed = 0
+        self.welcomes_sent = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+    
+    def start(self):
+        """Start the auto-role workers"""
+        self.workers = [asyncio.create_task(self._role_worker()) for _ in range(self.worker_count)]
+    
+    async def close(self):
+        """Stop the workers and any open welcome windows"""
+        tasks = self.workers + list(self.windows.values())
+        for handle in self.parked.values():
+            handle.cancel()
+        self.parked.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.workers = []
+        self.windows.clear()
+    
+    @property
+    def depth(self):
+        """Joins still waiting for a welcome or an auto-role"""
+        return sum(len(queue) for queue in self.roles.values()) + sum(len(members) for members in self.welcomes.values())
+    
+    def submit(self, member):
+        """Queue the welcome message and auto-role for a new member"""
+        settings = self.bot.settings.get(member.guild.id)
+        if not settings:
+            return
+        
+        if settings['welcome_channel_id'] and settings['welcome_message']:
+            guild_id = member.guild.id
+            if guild_id in self.windows:
+                self.welcomes.setdefault(guild_id, []).append(member)
+            else:
+                self.windows[guild_id] = asyncio.create_task(self._welcome_window(guild_id, [member]))
+        
+        if settings['autorole_id']:
+            queue = self.roles.setdefault(member.guild.id, collections.deque())
+            queue.append((member, settings['autorole_id'], time.monotonic()))
+            # A guild with older entries is already ready, parked or being served
+            if len(queue) == 1:
+                self.ready.put_nowait(member.guild.id)
+    
+    async def _welcome_window(self, guild_id, first):
+        try:
+            await self._announce(first)
+            while True:
+                await asyncio.sleep(self.window)
+                members = self.welcomes.pop(guild_id, None)
+                if not members:
+                    break
+                await self._announce(members)
+        finally:
+            self.windows.pop(guild_id, None)
+    
+    async def _announce(self, members):
+        guild = members[0].guild
+        settings = self.bot.settings.get(guild.id)
+        if not settings or not settings['welcome_message']:
+            return
+        
+        channel = guild.get_channel(settings['welcome_channel_id'])
+        if not channel:
+            return
+        
+        if len(members) == 1:
+            mentions = members[0].mention
+        else:
+            mentions = ", ".join(member.mention for member in members[:self.mention_limit])
+            if len(members) > self.mention_limit:
+                mentions += f" and {len(members) - self.mention_limit} more"
+        
+        msg = settings['welcome_message'].replace("{user}", mentions).replace("{server}", guild.name)
+        embed = discord.Embed(
+            description=msg[:4096],
+            color=discord.Color.green()
+        )
+        if len(members) == 1:
+            embed.set_thumbnail(url=members[0].display_avatar.url)
+        else:
+            embed.set_footer(text=f"{len(members)} new members")
+        
+        try:
+            await self.bot.outbox.send(channel, embed=embed)
+            self.welcomes_sent += 1
+        except discord.HTTPException as e:
+            log.warning('Failed to send welcome message in %s: %s', guild.id, e)
+    
+    def _bucket(self, guild_id):
+        bucket = self.buckets.get(guild_id)
+        if bucket is None:
+            if len(self.buckets) > 1000:
+                self.buckets = {gid: b for gid, b in self.buckets.items() if not b.is_full()}
+            bucket = self.buckets[guild_id] = TokenBucket(self.role_rate, self.role_per)
+        return bucket
+    
+    def _unpark(self, guild_id):
+        self.parked.pop(guild_id, None)
+        self.ready.put_nowait(guild_id)
+    
+    async def _role_worker(self):
+        while True:
+            guild_id = await self.ready.get()
+            queue = self.roles.get(guild_id)
+            if not queue:
+                continue
+            
+            bucket = self._bucket(guild_id)
+            wait = bucket.retry_after()
+            if wait > 0:
+                self.parked[guild_id] = asyncio.get_running_loop().call_later(wait, self._unpark, guild_id)
+                continue
+            
+            # The entry stays at the head until handled, so submit() never re-queues a guild being served
+            member, role_id, queued_at = queue[0]
+            try:
+                guild = member.guild
+                role = guild.get_role(role_id)
+                if role is None or (has_full_member_list(guild) and guild.get_member(member.id) is None):
+                    continue
+                
+                bucket.try_consume()
+                self.last_lag = time.monotonic() - queued_at
+                self.max_lag = max(self.max_lag, self.last_lag)
+                await member.add_roles(role, reason="Auto-role")
+                self.roles_assigned += 1
+            except discord.HTTPException as e:
+                self.roles_failed += 1
+                log.warning('Failed to assign auto-role in %s: %s', member.guild.id, e)
+            except Exception as e:
+                # Anything else would end this worker for good, so log it and move on
+                self.roles_failed += 1
+                log.exception('Auto-role worker error in %s: %s', member.guild.id, e)
+            finally:
+                queue.popleft()
+                if queue:
+                    # Back of the line, so every guild with pending roles gets a turn
+                    self.ready.put_nowait(guild_id)
+                else:
+                    del self.roles[guild_id]
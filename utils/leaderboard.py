@@ -0,0 +1,87 @@
+from collections import OrderedDict
+
+class GuildLeaderboard:
+    """Keyset-paginated leaderboard for one guild"""
+    
+    def __init__(self, per_page=10):
+        self.per_page = per_page
+        self.pages = {}         # 0-based page -> [(rank, user_id, xp, level), ...]
+        self.rendered = {}      # 1-based page -> rendered text, filled by the caller
+        self.members = set()    # user IDs read for a cached page, listed or skipped
+        self.total = None
+    
+    def page_count(self):
+        return max(1, -(-(self.total or 0) // self.per_page))
+    
+    async def _start(self, db, guild_id, page):
+        """The (xp, user_id) cursor a page begins after, or None for the first page"""
+        if page == 0:
+            return None
+        return await db.fetchone(
+            'SELECT xp, user_id FROM levels WHERE guild_id = ? '
+            'ORDER BY xp DESC, user_id ASC LIMIT 1 OFFSET ?',
+            (guild_id, page * self.per_page - 1)
+        )
+    
+    async def _rows(self, db, guild_id, cursor):
+        if cursor is None:
+            return await db.fetchall(
+                'SELECT user_id, xp, level FROM levels WHERE guild_id = ? '
+                'ORDER BY xp DESC, user_id ASC LIMIT ?',
+                (guild_id, self.per_page)
+            )
+        xp, user_id = cursor
+        return await db.fetchall(
+            'SELECT user_id, xp, level FROM levels WHERE guild_id = ? '
+            'AND (xp < ? OR (xp = ? AND user_id > ?)) '
+            'ORDER BY xp DESC, user_id ASC LIMIT ?',
+            (guild_id, xp, xp, user_id, self.per_page)
+        )
+    
+    async def fetch_page(self, db, guild_id, page, is_present):
+        """Return (rank, user_id, xp, level) rows on a 0-based page, leaving out members for whom is_present is False"""
+        if page in self.pages:
+            return self.pages[page]
+        
+        rows = []
+        cursor = await self._start(db, guild_id, page)
+        if page == 0 or cursor is not None:
+            for rank, (user_id, xp, level) in enumerate(await self._rows(db, guild_id, cursor), start=page * self.per_page + 1):
+                self.members.add(user_id)
+                if is_present(user_id):
+                    rows.append((rank, user_id, xp, level))
+        
+        self.pages[page] = rows
+        return rows
+
+class LeaderboardCache:
+    """Per-guild GuildLeaderboard objects, dropped whenever the guild's XP is written"""
+    
+    def __init__(self, per_page=10, max_guilds=200):
+        self.per_page = per_page
+        self.max_guilds = max_guilds
+        self.guilds = OrderedDict()
+    
+    def get(self, guild_id):
+        """Return the guild's cached leaderboard, creating an empty one if needed"""
+        board = self.guilds.get(guild_id)
+        if board is None:
+            board = self.guilds[guild_id] = GuildLeaderboard(self.per_page)
+            while len(self.guilds) > self.max_guilds:
+                self.guilds.popitem(last=False)
+        else:
+            self.guilds.move_to_end(guild_id)
+        return board
+    
+    def invalidate(self, guild_id=None):
+        """Forget one guild's pages, or every guild's"""
+        if guild_id is None:
+            self.guilds.clear()
+        else:
+            self.guilds.pop(guild_id, None)
+    
+    def invalidate_member(self, guild_id, user_id):
+        """Forget a guild's pages only if they were built from this member's row"""
+        board = self.guilds.get(guild_id)
+        if board is not None and user_id in board.members:
+            del self.guilds[guild_id]
@@ -0,0 +1,20 @@
+import math
+
+MAX_LEVEL = 5000
+
+def xp_for_level(level):
+    """XP required to reach a level"""
+    return (level ** 2) * 100
+
+# LEVEL_THRESHOLDS[n] is the XP needed for level n; levels stop at MAX_LEVEL
+LEVEL_THRESHOLDS = [xp_for_level(level) for level in range(MAX_LEVEL + 1)]
+
+def level_for_xp(xp):
+    """Level reached with the given XP, capped at MAX_LEVEL like the level_thresholds table"""
+    # level ** 2 * 100 <= xp exactly when level ** 2 <= xp // 100, so isqrt needs no float maths
+    return min(MAX_LEVEL, math.isqrt(xp // 100))
+
+def level_sql(xp_expression='levels.xp'):
+    """SQL expression computing the level for an XP expression from the level_thresholds table"""
+    # Seeks the unique xp index; MAX(level) would scan the level key backwards from the top
+    return f'(SELECT t.level FROM level_thresholds t WHERE t.xp <= {xp_expression} ORDER BY t.xp DESC LIMIT 1)'
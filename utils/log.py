@@ -0,0 +1,149 @@
+import atexit
+import copy
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+import traceback
+
+# Extra attributes copied into each JSON line when a record carries them
+CONTEXT_FIELDS = ('command', 'guild_id', 'channel_id', 'user_id', 'latency_ms', 'repeats')
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the record's context fields and exception"""
+    
+    def format(self, record):
+        entry = {
+            'time': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            exc_type, exc, tb = record.exc_info
+            entry['exception'] = {
+                'type': exc_type.__name__,
+                'message': str(exc),
+                'traceback': ''.join(traceback.format_exception(exc_type, exc, tb)),
+            }
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class DedupHandler(logging.Handler):
+    """Collapses repeats of the same exception into one line per window"""
+    
+    def __init__(self, target, window=60.0):
+        super().__init__()
+        self.target = target
+        self.window = window
+        self.seen = {}  # key -> [window_started, suppressed, last_record]
+    
+    @staticmethod
+    def _key(record):
+        exc_type, exc, tb = record.exc_info
+        while tb is not None and tb.tb_next is not None:
+            tb = tb.tb_next
+        where = (tb.tb_frame.f_code.co_filename, tb.tb_lineno) if tb else None
+        return exc_type, str(exc), where
+    
+    def emit(self, record):
+        if not record.exc_info or record.exc_info[0] is None:
+            self.target.handle(record)
+            return
+        
+        key = self._key(record)
+        now = time.monotonic()
+        state = self.seen.get(key)
+        if state is not None and now - state[0] < self.window:
+            state[1] += 1
+            state[2] = record
+            return
+        
+        if state is not None and state[1]:
+            record.repeats = state[1]
+        self.seen[key] = [now, 0, record]
+        if len(self.seen) > 1000:
+            self._summarize(lambda started: now - started >= self.window)
+        self.target.handle(record)
+    
+    def _summarize(self, expired):
+        for key, (started, suppressed, record) in list(self.seen.items()):
+            if not expired(started):
+                continue
+            del self.seen[key]
+            if suppressed:
+                summary = copy.copy(record)
+                summary.msg = f'{record.getMessage()} (repeated)'
+                summary.args = None
+                summary.repeats = suppressed
+                self.target.handle(summary)
+    
+    def close(self):
+        self._summarize(lambda started: True)
+        self.target.close()
+        super().close()
+
+class LossyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+    
+    dropped = 0
+    
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+    
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LossyQueueHandler.dropped += 1
+
+class LogListener(logging.handlers.QueueListener):
+    """QueueListener that can be stopped more than once and closes its handlers"""
+    
+    def stop(self):
+        if self._thread is None:
+            return
+        super().stop()
+        for handler in self.handlers:
+            handler.close()
+
+def setup_logging(path=None, level=logging.INFO, max_bytes=10_000_000, backups=5, queue_size=10_000):
+    """Route the root logger through a background thread writing JSON lines"""
+    if path:
+        output = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+    else:
+        output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter())
+    
+    log_queue = queue.Queue(queue_size)
+    listener = LogListener(log_queue, DedupHandler(output))
+    
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(LossyQueueHandler(log_queue))
+    
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+def command_context(ctx):
+    """Logging `extra` fields describing a command invocation"""
+    started = getattr(ctx, 'perf_started', None)
+    return {
+        'command': ctx.command.qualified_name if ctx.command else None,
+        'guild_id': ctx.guild.id if ctx.guild else None,
+        'channel_id': ctx.channel.id,
+        'user_id': ctx.author.id,
+        'latency_ms': round((time.perf_counter() - started) * 1000, 1) if started is not None else None,
+    }
@@ -0,0 +1,131 @@
+import asyncio
+import collections
+import re
+import discord
+from utils.ratelimit import BucketMap
+
+ID_PATTERN = re.compile(r'[\s,]*(?:<@!?)?(\d{15,20})>?(?=[\s,]|$)')
+FILE_ID_PATTERN = re.compile(r'\d{15,20}')
+MAX_FILE_BYTES = 1024 * 1024
+BULK_BAN_LIMIT = 200
+
+def split_targets(text):
+    """Split leading user IDs or mentions off the text; returns (ids, rest)"""
+    ids = []
+    position = 0
+    while True:
+        match = ID_PATTERN.match(text, position)
+        if match is None:
+            break
+        ids.append(int(match.group(1)))
+        position = match.end()
+    return ids, text[position:].strip()
+
+async def read_id_files(attachments, max_bytes=MAX_FILE_BYTES):
+    """Read user IDs from uploaded text files; returns (ids, names of skipped files)"""
+    ids = []
+    skipped = []
+    for attachment in attachments:
+        is_text = attachment.filename.lower().endswith(('.txt', '.csv')) or (attachment.content_type or '').startswith('text/')
+        if not is_text or attachment.size > max_bytes:
+            skipped.append(attachment.filename)
+            continue
+        data = await attachment.read()
+        ids.extend(int(user_id) for user_id in FILE_ID_PATTERN.findall(data.decode('utf-8', 'replace')))
+    return ids, skipped
+
+class MassResult:
+    """Which users an action succeeded for, and why it failed for the rest"""
+    
+    def __init__(self):
+        self.succeeded = []
+        self.failed = collections.defaultdict(list)   # reason -> user IDs
+    
+    @property
+    def failed_count(self):
+        return sum(len(ids) for ids in self.failed.values())
+    
+    def fail(self, reason, *user_ids):
+        self.failed[reason].extend(user_ids)
+    
+    def fail_error(self, user_id, error):
+        if isinstance(error, discord.NotFound):
+            self.fail('not found', user_id)
+        elif isinstance(error, discord.Forbidden):
+            self.fail('missing permissions', user_id)
+        else:
+            self.fail(f'HTTP {error.status}', user_id)
+
+class MassModerator:
+    """Applies bans, kicks and timeouts to many users at once"""
+    
+    def __init__(self, bot, workers=4, route_rate=5, route_per=2.0):
+        self.bot = bot
+        self.workers = workers
+        self.buckets = {route: BucketMap(route_rate, route_per) for route in ('ban', 'kick', 'timeout')}
+        self.bulk_buckets = BucketMap(1, 2.0)
+    
+    async def ban(self, guild, user_ids, reason=None, delete_message_seconds=0):
+        if not hasattr(guild, 'bulk_ban'):
+            return await self._run(guild, 'ban', user_ids, lambda user_id: guild.ban(
+                discord.Object(user_id), reason=reason, delete_message_seconds=delete_message_seconds
+            ))
+        
+        result = MassResult()
+        for start in range(0, len(user_ids), BULK_BAN_LIMIT):
+            chunk = user_ids[start:start + BULK_BAN_LIMIT]
+            await self._pace(self.bulk_buckets, guild)
+            try:
+                banned = await guild.bulk_ban(
+                    [discord.Object(user_id) for user_id in chunk],
+                    reason=reason,
+                    delete_message_seconds=delete_message_seconds
+                )
+            except discord.Forbidden:
+                result.fail('missing permissions', *user_ids[start:])
+                break
+            except discord.HTTPException as e:
+                # Discord rejects the whole call when none of the users could be banned
+                result.fail('already banned or not bannable' if e.code == 500000 else f'HTTP {e.status}', *chunk)
+                continue
+            result.succeeded.extend(user.id for user in banned.banned)
+            result.fail('already banned or not bannable', *(user.id for user in banned.failed))
+        return result
+    
+    async def kick(self, guild, user_ids, reason=None):
+        return await self._run(guild, 'kick', user_ids, lambda user_id: guild.kick(discord.Object(user_id), reason=reason))
+    
+    async def timeout(self, guild, user_ids, until, reason=None):
+        async def timeout_one(user_id):
+            member = guild.get_member(user_id)
+            if member is not None:
+                await member.timeout(until, reason=reason)
+            else:
+                # Editing by ID saves fetching members that are not cached
+                await self.bot.http.edit_member(
+                    guild.id, user_id, reason=reason, communication_disabled_until=until.isoformat()
+                )
+        return await self._run(guild, 'timeout', user_ids, timeout_one)
+    
+    async def _pace(self, buckets, guild):
+        delay = buckets.get(guild.id).reserve()
+        if delay:
+            await asyncio.sleep(delay)
+    
+    async def _run(self, guild, route, user_ids, action):
+        result = MassResult()
+        pending = iter(user_ids)
+        buckets = self.buckets[route]
+        
+        async def worker():
+            for user_id in pending:
+                await self._pace(buckets, guild)
+                try:
+                    await action(user_id)
+                except discord.HTTPException as e:
+                    result.fail_error(user_id, e)
+                else:
+                    result.succeeded.append(user_id)
+        
+        await asyncio.gather(*(worker() for _ in range(min(self.workers, len(user_ids)))))
+        return result
@@ -0,0 +1,124 @@
+import bisect
+import collections
+import functools
+import time
+from aiohttp import web
+
+# Histogram bucket upper bounds in seconds, as exported to Prometheus
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Timing:
+    """Call count, errors and latency distribution for one command or listener"""
+    
+    __slots__ = ('count', 'errors', 'total', 'buckets', 'recent')
+    
+    def __init__(self, window=1024):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.recent = collections.deque(maxlen=window)
+    
+    def observe(self, seconds, error=False):
+        self.count += 1
+        self.errors += error
+        self.total += seconds
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.recent.append(seconds)
+    
+    def percentiles(self, *quantiles):
+        """Latency at each quantile (0-1) over the recent window"""
+        samples = sorted(self.recent)
+        if not samples:
+            return [0.0] * len(quantiles)
+        return [samples[min(len(samples) - 1, int(q * len(samples)))] for q in quantiles]
+    
+    @property
+    def error_rate(self):
+        return self.errors / self.count if self.count else 0.0
+
+class Metrics:
+    """In-memory timings keyed by kind ('command' or 'listener') and name"""
+    
+    def __init__(self, labels=None):
+        self.timings = {}
+        self.labels = labels or {}
+    
+    def observe(self, kind, name, seconds, error=False):
+        timing = self.timings.get((kind, name))
+        if timing is None:
+            timing = self.timings[(kind, name)] = Timing()
+        timing.observe(seconds, error)
+    
+    def command_started(self, ctx):
+        ctx.perf_started = time.perf_counter()
+    
+    def command_finished(self, ctx, error=False):
+        started = getattr(ctx, 'perf_started', None)
+        if started is not None and ctx.command is not None:
+            self.observe('command', ctx.command.qualified_name, time.perf_counter() - started, error)
+    
+    def render_prometheus(self):
+        """All timings in the Prometheus text exposition format"""
+        lines = [
+            '# HELP discord_bot_handler_seconds Time spent handling commands and events.',
+            '# TYPE discord_bot_handler_seconds histogram',
+        ]
+        errors = [
+            '# HELP discord_bot_handler_errors_total Handler invocations that raised.',
+            '# TYPE discord_bot_handler_errors_total counter',
+        ]
+        base = ''.join(f'{key}="{value}",' for key, value in self.labels.items())
+        for (kind, name), timing in sorted(self.timings.items()):
+            labels = f'{base}kind="{kind}",name="{name}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), timing.buckets):
+                cumulative += count
+                lines.append(f'discord_bot_handler_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'discord_bot_handler_seconds_sum{{{labels}}} {timing.total}')
+            lines.append(f'discord_bot_handler_seconds_count{{{labels}}} {timing.count}')
+            errors.append(f'discord_bot_handler_errors_total{{{labels}}} {timing.errors}')
+        return '\n'.join(lines + errors) + '\n'
+
+def timed(name):
+    """Record a cog listener's run time under `name` in the bot's metrics"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            started = time.perf_counter()
+            error = False
+            try:
+                return await func(self, *args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                metrics = getattr(self.bot, 'metrics', None)
+                if metrics is not None:
+                    metrics.observe('listener', name, time.perf_counter() - started, error)
+        return wrapper
+    return decorator
+
+class MetricsServer:
+    """Serves /metrics for Prometheus to scrape"""
+    
+    def __init__(self, metrics, host='127.0.0.1', port=9100):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._runner = None
+    
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+    
+    async def close(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+    
+    async def _handle(self, request):
+        return web.Response(text=self.metrics.render_prometheus(), content_type='text/plain', charset='utf-8')
@@ -0,0 +1,138 @@
+import datetime
+from utils.leveling import LEVEL_THRESHOLDS
+
+async def _seed_level_thresholds(conn):
+    await conn.executemany(
+        'INSERT OR REPLACE INTO level_thresholds (level, xp) VALUES (?, ?)',
+        list(enumerate(LEVEL_THRESHOLDS))
+    )
+
+# Ordered (version, description, steps). A step is a SQL string or an async
+# callable taking the connection. Never edit a released migration; append a new one.
+MIGRATIONS = [
+    (1, 'initial schema', [
+        '''
+        CREATE TABLE IF NOT EXISTS guild_settings (
+            guild_id INTEGER PRIMARY KEY,
+            prefix TEXT DEFAULT NULL,
+            welcome_channel_id INTEGER DEFAULT NULL,
+            welcome_message TEXT DEFAULT NULL,
+            leave_message TEXT DEFAULT NULL,
+            autorole_id INTEGER DEFAULT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS levels (
+            user_id INTEGER,
+            guild_id INTEGER,
+            xp INTEGER DEFAULT 0,
+            level INTEGER DEFAULT 0,
+            PRIMARY KEY (user_id, guild_id)
+        )
+        ''',
+        'DROP TABLE IF EXISTS example',
+    ]),
+    (2, 'index levels by guild and xp', [
+        'DROP INDEX IF EXISTS idx_levels_guild_xp',
+        'CREATE INDEX idx_levels_guild_xp ON levels (guild_id, xp DESC, user_id)',
+    ]),
+    (3, 'per-guild level settings', [
+        '''
+        CREATE TABLE IF NOT EXISTS level_settings (
+            guild_id INTEGER PRIMARY KEY,
+            xp_cooldown INTEGER DEFAULT NULL
+        )
+        ''',
+    ]),
+    (4, 'level threshold table', [
+        '''
+        CREATE TABLE IF NOT EXISTS level_thresholds (
+            level INTEGER PRIMARY KEY,
+            xp INTEGER NOT NULL UNIQUE
+        )
+        ''',
+        _seed_level_thresholds,
+    ]),
+    (5, 'cluster stats', [
+        '''
+        CREATE TABLE IF NOT EXISTS cluster_stats (
+            cluster_id TEXT PRIMARY KEY,
+            shard_ids TEXT NOT NULL DEFAULT '',
+            guilds INTEGER NOT NULL DEFAULT 0,
+            users INTEGER NOT NULL DEFAULT 0,
+            latency REAL,
+            updated_at REAL NOT NULL
+        )
+        ''',
+    ]),
+    (6, 'reminders', [
+        '''
+        CREATE TABLE IF NOT EXISTS reminders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            guild_id INTEGER,
+            channel_id INTEGER NOT NULL,
+            message TEXT NOT NULL,
+            due_at REAL NOT NULL,
+            created_at REAL NOT NULL
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_reminders_user_due ON reminders (user_id, due_at)',
+    ]),
+    (7, 'button polls', [
+        '''
+        CREATE TABLE IF NOT EXISTS polls (
+            message_id INTEGER PRIMARY KEY,
+            channel_id INTEGER NOT NULL,
+            guild_id INTEGER,
+            author_id INTEGER NOT NULL,
+            question TEXT NOT NULL,
+            options TEXT NOT NULL,
+            ends_at REAL NOT NULL,
+            closed INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS poll_votes (
+            message_id INTEGER NOT NULL REFERENCES polls (message_id) ON DELETE CASCADE,
+            user_id INTEGER NOT NULL,
+            option INTEGER NOT NULL,
+            PRIMARY KEY (message_id, user_id)
+        )
+        ''',
+    ]),
+]
+
+async def run_migrations(db):
+    """Bring the schema up to date in a single transaction and return the versions applied"""
+    applied = []
+    async with db.transaction() as conn:
+        await conn.execute('BEGIN IMMEDIATE')
+        await conn.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TEXT NOT NULL
+            )
+        ''')
+        async with conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version') as cursor:
+            current = (await cursor.fetchone())[0]
+        
+        for version, description, steps in MIGRATIONS:
+            if version <= current:
+                continue
+            for step in steps:
+                if callable(step):
+                    await step(conn)
+                else:
+                    await conn.execute(step)
+            await conn.execute(
+                'INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)',
+                (version, description, datetime.datetime.now(datetime.timezone.utc).isoformat())
+            )
+            applied.append(version)
+    
+    if applied:
+        # Refresh planner statistics for the new tables and indexes
+        await db.execute('PRAGMA optimize')
+    return applied
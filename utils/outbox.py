@@ -0,0 +1,168 @@
+import asyncio
+import collections
+import logging
+import time
+import discord
+from utils.ratelimit import BucketMap, TokenBucket
+
+log = logging.getLogger(__name__)
+
+class Notice:
+    """A low-priority line that may be merged with others of the same group"""
+    
+    __slots__ = ('group', 'line', 'title', 'color', 'queued_at', 'expires_at')
+    
+    def __init__(self, group, line, title, color, delete_after):
+        self.group = group
+        self.line = line
+        self.title = title
+        self.color = color
+        self.queued_at = time.monotonic()
+        self.expires_at = self.queued_at + delete_after if delete_after else None
+
+class ChannelQueue:
+    """Pending sends for one channel, drained by a single task"""
+    
+    __slots__ = ('channel', 'messages', 'notices', 'wakeup', 'task')
+    
+    def __init__(self, channel):
+        self.channel = channel
+        self.messages = collections.deque()   # (future, send kwargs), sent first
+        self.notices = collections.deque()    # Notice, merged by group
+        self.wakeup = asyncio.Event()         # set when a regular message arrives
+        self.task = None
+
+class Outbox:
+    """Outbound message scheduler with one queue per channel"""
+    
+    def __init__(self, channel_rate=5, channel_per=5.0, global_rate=45, merge_window=1.0,
+                 max_lines=20, max_notices=100):
+        # Buckets outlive the queues, which are dropped as soon as they drain
+        self.buckets = BucketMap(channel_rate, channel_per)
+        self.global_bucket = TokenBucket(global_rate, 1.0)
+        self.merge_window = merge_window
+        self.max_lines = max_lines
+        self.max_notices = max_notices
+        self.queues = {}   # channel_id -> ChannelQueue
+        
+        self.sent = 0
+        self.merged = 0
+        self.dropped = 0
+    
+    @property
+    def depth(self):
+        """Messages and notices waiting to be sent"""
+        return sum(len(queue.messages) + len(queue.notices) for queue in self.queues.values())
+    
+    def _queue(self, channel):
+        queue = self.queues.get(channel.id)
+        if queue is None:
+            queue = self.queues[channel.id] = ChannelQueue(channel)
+        if queue.task is None:
+            queue.task = asyncio.create_task(self._drain(queue))
+        return queue
+    
+    async def send(self, channel, **kwargs):
+        """Queue a regular message and wait for it to be sent; returns the Message"""
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queue(channel)
+        queue.messages.append((future, kwargs))
+        queue.wakeup.set()
+        return await future
+    
+    def notify(self, channel, line, *, group='notice', title=None, color=None, delete_after=None):
+        """Queue a low-priority line without waiting for it"""
+        queue = self._queue(channel)
+        if len(queue.notices) >= self.max_notices:
+            queue.notices.popleft()
+            self.dropped += 1
+        queue.notices.append(Notice(group, line, title, color, delete_after))
+    
+    async def close(self):
+        """Stop every drain task, failing messages that were still waiting"""
+        tasks = [queue.task for queue in self.queues.values() if queue.task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for queue in self.queues.values():
+            for future, _ in queue.messages:
+                future.cancel()
+        self.queues.clear()
+    
+    async def _pace(self, queue):
+        delay = max(self.buckets.get(queue.channel.id).reserve(), self.global_bucket.reserve())
+        if delay:
+            await asyncio.sleep(delay)
+    
+    async def _drain(self, queue):
+        try:
+            while queue.messages or queue.notices:
+                if queue.messages:
+                    future, kwargs = queue.messages.popleft()
+                    if future.done():
+                        continue
+                    await self._pace(queue)
+                    try:
+                        message = await queue.channel.send(**kwargs)
+                    except Exception as e:
+                        if not future.done():
+                            future.set_exception(e)
+                    else:
+                        self.sent += 1
+                        if not future.done():
+                            future.set_result(message)
+                    continue
+                
+                # Give notices arriving right behind this one a chance to join it
+                wait = queue.notices[0].queued_at + self.merge_window - time.monotonic()
+                if wait > 0:
+                    queue.wakeup.clear()
+                    try:
+                        await asyncio.wait_for(queue.wakeup.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                
+                batch = self._take_notices(queue)
+                if not batch:
+                    continue
+                await self._pace(queue)
+                await self._send_notices(queue.channel, batch)
+        finally:
+            if self.queues.get(queue.channel.id) is queue:
+                del self.queues[queue.channel.id]
+    
+    def _take_notices(self, queue):
+        group = queue.notices[0].group
+        batch = []
+        rest = collections.deque()
+        for notice in queue.notices:
+            if notice.group == group and len(batch) < self.max_lines:
+                batch.append(notice)
+            else:
+                rest.append(notice)
+        queue.notices = rest
+        return batch
+    
+    async def _send_notices(self, channel, batch):
+        # Pacing may have waited, so check expiry right before sending
+        now = time.monotonic()
+        live = [notice for notice in batch if notice.expires_at is None or notice.expires_at > now]
+        self.dropped += len(batch) - len(live)
+        if not live:
+            return
+        
+        first = live[0]
+        embed = discord.Embed(
+            title=first.title,
+            description="\n".join(notice.line for notice in live)[:4096],
+            color=first.color
+        )
+        expiries = [notice.expires_at for notice in live]
+        delete_after = None if None in expiries else max(expiries) - now
+        try:
+            await channel.send(embed=embed, delete_after=delete_after)
+            self.sent += 1
+            self.merged += len(live) - 1
+        except discord.HTTPException as e:
+            log.warning('Failed to send %d notices to channel %s: %s', len(live), channel.id, e)
@@ -0,0 +1,210 @@
+import asyncio
+import functools
+import json
+import logging
+import time
+import discord
+from utils.cluster import owns_guild
+
+log = logging.getLogger(__name__)
+
+MAX_OPTIONS = 10
+
+class Poll:
+    """One open poll and its votes"""
+    
+    __slots__ = ('message_id', 'channel_id', 'guild_id', 'author_id', 'question', 'options', 'ends_at',
+                 'votes', 'counts', 'dirty')
+    
+    def __init__(self, message_id, channel_id, guild_id, author_id, question, options, ends_at):
+        self.message_id = message_id
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.author_id = author_id
+        self.question = question
+        self.options = options
+        self.ends_at = ends_at
+        self.votes = {}                       # user_id -> option index
+        self.counts = [0] * len(options)
+        self.dirty = False                    # message shows stale counts
+    
+    def vote(self, user_id, index):
+        """Record a user's vote, replacing any earlier one; returns False if nothing changed"""
+        previous = self.votes.get(user_id)
+        if previous == index:
+            return False
+        if previous is not None:
+            self.counts[previous] -= 1
+        self.votes[user_id] = index
+        self.counts[index] += 1
+        self.dirty = True
+        return True
+    
+    def embed(self, final=False):
+        total = sum(self.counts)
+        lines = []
+        for index, (option, count) in enumerate(zip(self.options, self.counts)):
+            share = count / total if total else 0
+            bar = '█' * round(share * 10) + '░' * (10 - round(share * 10))
+            lines.append(f"**{index + 1}.** {option}\n`{bar}` {count} ({share:.0%})")
+        
+        if final:
+            leading = max(self.counts) if total else 0
+            winners = [option for option, count in zip(self.options, self.counts) if count == leading and total]
+            status = f"🏁 Poll ended • Winner: **{' / '.join(winners)}**" if winners else "🏁 Poll ended with no votes"
+        else:
+            status = f"Ends <t:{int(self.ends_at)}:R>"
+        
+        embed = discord.Embed(
+            title=f"📊 {self.question}"[:256],
+            description="\n".join(lines + [f"\n{status} • Poll by <@{self.author_id}>"])[:4096],
+            color=discord.Color.red()
+        )
+        embed.set_footer(text=f"{total} vote{'s' if total != 1 else ''}")
+        return embed
+
+class PollView(discord.ui.View):
+    """Vote buttons; custom IDs are shared by every poll so one registered view serves them all"""
+    
+    def __init__(self, manager, options):
+        super().__init__(timeout=None)
+        for index, option in enumerate(options):
+            button = discord.ui.Button(
+                label=f"{index + 1}. {option}"[:80],
+                custom_id=f'poll:{index}',
+                style=discord.ButtonStyle.secondary,
+                row=index // 5
+            )
+            button.callback = functools.partial(manager.vote, index=index)
+            self.add_item(button)
+
+class PollManager:
+    """Button polls with votes counted in memory"""
+    
+    def __init__(self, bot, interval=5.0):
+        self.bot = bot
+        self.interval = interval
+        self.polls = {}            # message_id -> Poll
+        self.pending_votes = {}    # (message_id, user_id) -> option index, not yet written
+        self._task = None
+    
+    async def load(self):
+        """Load open polls and register the persistent vote buttons"""
+        rows = await self.bot.db.fetchall(
+            'SELECT message_id, channel_id, guild_id, author_id, question, options, ends_at FROM polls WHERE closed = 0'
+        )
+        self.polls = {
+            row[0]: Poll(*row[:5], json.loads(row[5]), row[6])
+            for row in rows
+            if owns_guild(self.bot, row[2])
+        }
+        votes = await self.bot.db.fetchall(
+            'SELECT v.message_id, v.user_id, v.option FROM poll_votes v '
+            'JOIN polls p ON p.message_id = v.message_id WHERE p.closed = 0'
+        )
+        for message_id, user_id, option in votes:
+            poll = self.polls.get(message_id)
+            if poll is not None:
+                poll.vote(user_id, option)
+        for poll in self.polls.values():
+            poll.dirty = False
+        self.bot.add_view(PollView(self, [str(index + 1) for index in range(MAX_OPTIONS)]))
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+    
+    async def create(self, channel, author, question, options, duration):
+        """Post a poll in a channel; returns the message"""
+        poll = Poll(None, channel.id, channel.guild.id if channel.guild else None, author.id,
+                    question, list(options), time.time() + duration)
+        view = PollView(self, poll.options)
+        message = await channel.send(embed=poll.embed(), view=view)
+        # Votes are routed through the persistent view registered in load(), so this one needn't stay stored
+        view.stop()
+        poll.message_id = message.id
+        self.polls[message.id] = poll
+        await self.bot.db.execute(
+            'INSERT INTO polls (message_id, channel_id, guild_id, author_id, question, options, ends_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (message.id, poll.channel_id, poll.guild_id, poll.author_id, question, json.dumps(poll.options), poll.ends_at)
+        )
+        return message
+    
+    async def vote(self, interaction, index):
+        poll = self.polls.get(interaction.message.id)
+        if poll is None or index >= len(poll.options):
+            await interaction.response.send_message("This poll has ended.", ephemeral=True)
+            return
+        
+        if poll.vote(interaction.user.id, index):
+            self.pending_votes[(poll.message_id, interaction.user.id)] = index
+            reply = f"🗳️ You voted for **{poll.options[index]}**"
+        else:
+            reply = f"You already voted for **{poll.options[index]}**"
+        await interaction.response.send_message(reply, ephemeral=True)
+    
+    async def end(self, message_id):
+        """Close a poll now and post its final tally; returns False if it is not open"""
+        poll = self.polls.pop(message_id, None)
+        if poll is None:
+            return False
+        await self.flush()
+        await self.bot.db.execute('UPDATE polls SET closed = 1 WHERE message_id = ?', (message_id,))
+        try:
+            await self._message(poll).edit(embed=poll.embed(final=True), view=None)
+        except discord.HTTPException as e:
+            log.warning('Failed to post final results for poll %s: %s', message_id, e)
+        return True
+    
+    async def flush(self):
+        """Write votes cast since the last flush"""
+        if not self.pending_votes:
+            return
+        batch, self.pending_votes = self.pending_votes, {}
+        try:
+            await self.bot.db.executemany(
+                'INSERT INTO poll_votes (message_id, user_id, option) VALUES (?, ?, ?) '
+                'ON CONFLICT (message_id, user_id) DO UPDATE SET option = excluded.option',
+                [(message_id, user_id, option) for (message_id, user_id), option in batch.items()]
+            )
+        except Exception:
+            # Keep the votes for the next attempt, without overwriting newer ones
+            self.pending_votes = {**batch, **self.pending_votes}
+            raise
+    
+    def _message(self, poll):
+        channel = self.bot.get_channel(poll.channel_id) or self.bot.get_partial_messageable(poll.channel_id)
+        return channel.get_partial_message(poll.message_id)
+    
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                await self.flush()
+                now = time.time()
+                for poll in [poll for poll in self.polls.values() if poll.ends_at <= now]:
+                    await self.end(poll.message_id)
+                for poll in [poll for poll in self.polls.values() if poll.dirty]:
+                    poll.dirty = False
+                    await self._edit(poll)
+            except Exception as e:
+                log.exception('Poll update failed: %s', e)
+            await asyncio.sleep(self.interval)
+    
+    async def _edit(self, poll):
+        try:
+            await self._message(poll).edit(embed=poll.embed())
+        except discord.NotFound:
+            # The poll message was deleted; stop tracking it
+            self.polls.pop(poll.message_id, None)
+            await self.bot.db.execute('UPDATE polls SET closed = 1 WHERE message_id = ?', (poll.message_id,))
+        except discord.HTTPException as e:
+            poll.dirty = True
+            log.warning('Failed to update poll %s: %s', poll.message_id, e)
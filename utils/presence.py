@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import time
+import discord
+
+log = logging.getLogger(__name__)
+
+class PresenceManager:
+    """Keeps the bot's status current without flooding the gateway"""
+    
+    def __init__(self, bot, templates, prefix, rotate_interval=60.0, min_interval=15.0, debounce=5.0,
+                 activity_type=discord.ActivityType.watching):
+        self.bot = bot
+        self.templates = templates   # str.format strings using {prefix}, {guilds}, {shards} and {commands}
+        self.prefix = prefix
+        self.rotate_interval = rotate_interval
+        self.min_interval = min_interval
+        self.debounce = debounce
+        self.activity_type = activity_type
+        
+        self.guilds = 0
+        self.index = 0
+        self.current = None
+        self.last_push = 0.0
+        self.pushes = 0
+        self._changed = asyncio.Event()
+        self._task = None
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+    
+    def set_guild_count(self, count):
+        """Resynchronise the count, e.g. after (re)connecting"""
+        self.guilds = count
+        self._changed.set()
+    
+    def guild_joined(self):
+        self.guilds += 1
+        self._changed.set()
+    
+    def guild_removed(self):
+        self.guilds = max(0, self.guilds - 1)
+        self._changed.set()
+    
+    async def render(self):
+        guilds = self.guilds
+        if self.bot.cluster.clustered:
+            guilds = (await self.bot.cluster.totals())['guilds']
+        return self.templates[self.index % len(self.templates)].format(
+            prefix=self.prefix,
+            guilds=guilds,
+            shards=len(self.bot.shards) if hasattr(self.bot, 'shards') else 1,
+            commands=len(self.bot.commands),
+        )
+    
+    async def push(self):
+        text = await self.render()
+        if text == self.current:
+            return
+        await self.bot.change_presence(activity=discord.Activity(type=self.activity_type, name=text))
+        self.current = text
+        self.last_push = time.monotonic()
+        self.pushes += 1
+    
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        self.guilds = len(self.bot.guilds)
+        rotating = len(self.templates) > 1
+        next_rotation = time.monotonic() + self.rotate_interval
+        while True:
+            try:
+                await self.push()
+            except Exception as e:
+                log.warning('Failed to update presence: %s', e)
+            
+            self._changed.clear()
+            try:
+                timeout = max(0.0, next_rotation - time.monotonic()) if rotating else None
+                await asyncio.wait_for(self._changed.wait(), timeout)
+                # Let the rest of a burst of joins or leaves arrive before pushing
+                await asyncio.sleep(self.debounce)
+            except asyncio.TimeoutError:
+                pass
+            
+            if rotating and time.monotonic() >= next_rotation:
+                self.index += 1
+                next_rotation = time.monotonic() + self.rotate_interval
+            
+            wait = self.last_push + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
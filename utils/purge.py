@@ -0,0 +1,210 @@
+import asyncio
+import datetime
+import logging
+import re
+import time
+import typing
+import discord
+from discord.ext import commands
+from utils.ratelimit import TokenBucket
+
+log = logging.getLogger(__name__)
+
+BULK_LIMIT = 100
+# Discord refuses to bulk delete messages older than 14 days; keep clear of the boundary
+BULK_MAX_AGE = datetime.timedelta(days=14) - datetime.timedelta(minutes=5)
+LINK_PATTERN = re.compile(r'https?://\S+|discord(?:\.gg|(?:app)?\.com/invite)/\S+', re.IGNORECASE)
+DURATION_PATTERN = re.compile(r'(\d+)\s*([smhdw])')
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+class Duration(commands.Converter):
+    """Converts text like 30m, 2h or 1d12h into a timedelta"""
+    
+    async def convert(self, ctx, argument):
+        text = argument.strip().lower()
+        parts = DURATION_PATTERN.findall(text)
+        if not parts or DURATION_PATTERN.sub('', text).strip():
+            raise commands.BadArgument(f'"{argument}" is not a duration like 30m, 2h or 7d')
+        return datetime.timedelta(seconds=sum(int(amount) * DURATION_UNITS[unit] for amount, unit in parts))
+
+class Pattern(commands.Converter):
+    """Compiles a case-insensitive regular expression"""
+    
+    async def convert(self, ctx, argument):
+        if len(argument) > 1 and argument[0] == argument[-1] and argument[0] in '"\'':
+            argument = argument[1:-1]
+        try:
+            return re.compile(argument, re.IGNORECASE)
+        except re.error as e:
+            raise commands.BadArgument(f'Invalid regex: {e}')
+
+class PurgeFlags(commands.FlagConverter):
+    """Filters for !clear; every filter given must match"""
+    
+    # discord.Object takes a mention or ID without looking the user up
+    user: typing.List[discord.Object] = commands.flag(default=lambda ctx: [])
+    bots: bool = False
+    regex: typing.Optional[Pattern] = None
+    attachments: bool = False
+    links: bool = False
+    since: typing.Optional[Duration] = None
+    until: typing.Optional[Duration] = None
+    scan: typing.Optional[int] = None
+
+class PurgeFilter:
+    """Decides which scanned messages a purge deletes"""
+    
+    __slots__ = ('users', 'bots', 'pattern', 'attachments', 'links')
+    
+    def __init__(self, users=(), bots=False, pattern=None, attachments=False, links=False):
+        self.users = {user.id for user in users}
+        self.bots = bots
+        self.pattern = pattern
+        self.attachments = attachments
+        self.links = links
+    
+    @classmethod
+    def from_flags(cls, flags):
+        return cls(flags.user, flags.bots, flags.regex, flags.attachments, flags.links)
+    
+    @property
+    def active(self):
+        return bool(self.users or self.bots or self.pattern or self.attachments or self.links)
+    
+    def describe(self):
+        parts = []
+        if self.users:
+            parts.append(', '.join(f'<@{user_id}>' for user_id in self.users))
+        if self.bots:
+            parts.append('bots')
+        if self.pattern:
+            parts.append(f'matching `{self.pattern.pattern}`')
+        if self.attachments:
+            parts.append('with attachments')
+        if self.links:
+            parts.append('with links')
+        return ' • '.join(parts) or 'all messages'
+    
+    def matches(self, message):
+        if self.users and message.author.id not in self.users:
+            return False
+        if self.bots and not message.author.bot:
+            return False
+        if self.attachments and not message.attachments:
+            return False
+        if self.links and not LINK_PATTERN.search(message.content):
+            return False
+        if self.pattern and not self.pattern.search(message.content):
+            return False
+        return True
+
+class PurgeJob:
+    """A streaming, cancellable purge of one channel"""
+    
+    def __init__(self, channel, limit, scan_limit, purge_filter, before=None, since=None,
+                 bulk_rate=(1, 1.0), single_rate=(1, 1.2)):
+        self.channel = channel
+        self.limit = limit
+        self.scan_limit = scan_limit
+        self.filter = purge_filter
+        self.before = before
+        self.since = since
+        self.bulk_bucket = TokenBucket(*bulk_rate)
+        self.single_bucket = TokenBucket(*single_rate)
+        
+        self.scanned = 0
+        self.matched = 0
+        self.bulk_deleted = 0
+        self.single_deleted = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self.finished = None
+        self._cancelled = asyncio.Event()
+    
+    @property
+    def deleted(self):
+        return self.bulk_deleted + self.single_deleted
+    
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+    
+    def cancel(self):
+        self._cancelled.set()
+    
+    async def run(self, progress=None, progress_interval=3.0):
+        """Purge the channel, awaiting progress(job) at most every progress_interval seconds"""
+        cutoff = discord.utils.utcnow() - BULK_MAX_AGE
+        batch = []
+        next_report = time.monotonic() + progress_interval
+        try:
+            async for message in self.channel.history(limit=self.scan_limit, before=self.before):
+                if self.cancelled or (self.since and message.created_at < self.since):
+                    break
+                self.scanned += 1
+                if not self.filter.matches(message):
+                    continue
+                
+                self.matched += 1
+                if message.created_at > cutoff:
+                    batch.append(message)
+                    if len(batch) == BULK_LIMIT:
+                        await self._bulk_delete(batch)
+                        batch = []
+                else:
+                    # History runs newest first, so everything from here on is too old to bulk delete
+                    if batch:
+                        await self._bulk_delete(batch)
+                        batch = []
+                    await self._single_delete(message)
+                
+                if self.matched >= self.limit:
+                    break
+                if progress and time.monotonic() >= next_report:
+                    await progress(self)
+                    next_report = time.monotonic() + progress_interval
+            
+            if batch and not self.cancelled:
+                await self._bulk_delete(batch)
+        finally:
+            self.finished = time.monotonic()
+    
+    async def _pace(self, bucket):
+        delay = bucket.reserve()
+        if delay:
+            # Wake early if the purge is cancelled while waiting
+            try:
+                await asyncio.wait_for(self._cancelled.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def _bulk_delete(self, batch):
+        await self._pace(self.bulk_bucket)
+        if self.cancelled:
+            return
+        try:
+            # A single message goes through the regular delete route
+            await self.channel.delete_messages(batch, reason='Purge')
+            self.bulk_deleted += len(batch)
+        except discord.NotFound:
+            pass
+        except discord.Forbidden:
+            raise
+        except discord.HTTPException as e:
+            self.failed += len(batch)
+            log.warning('Bulk delete of %d messages in channel %s failed: %s', len(batch), self.channel.id, e)
+    
+    async def _single_delete(self, message):
+        await self._pace(self.single_bucket)
+        if self.cancelled:
+            return
+        try:
+            await message.delete()
+            self.single_deleted += 1
+        except discord.NotFound:
+            pass
+        except discord.Forbidden:
+            raise
+        except discord.HTTPException as e:
+            self.failed += 1
+            log.warning('Failed to delete message %s in channel %s: %s', message.id, self.channel.id, e)
@@ -0,0 +1,168 @@
+import asyncio
+from collections import OrderedDict
+
+class FenwickTree:
+    """Binary indexed tree of counts supporting prefix sums in O(log n)"""
+    
+    def __init__(self, size):
+        self.size = size
+        self.tree = [0] * (size + 1)
+    
+    def add(self, index, delta):
+        """Add delta to the count at a zero-based index"""
+        index += 1
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+    
+    def prefix(self, index):
+        """Sum of counts at indexes [0, index]"""
+        index = min(index, self.size - 1) + 1
+        total = 0
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+class GuildRanking:
+    """Order-statistic view of one guild's XP"""
+    
+    def __init__(self, bucket_width=64, buckets=1024):
+        self.bucket_width = bucket_width
+        self.tree = FenwickTree(buckets)
+        self.buckets = {}   # bucket index -> {xp: member count}
+        self.members = {}   # user_id -> xp
+    
+    def __len__(self):
+        return len(self.members)
+    
+    def _grow(self, bucket):
+        size = self.tree.size
+        while size <= bucket:
+            size *= 2
+        self.tree = FenwickTree(size)
+        for index, counts in self.buckets.items():
+            self.tree.add(index, sum(counts.values()))
+    
+    def _insert(self, xp):
+        bucket = xp // self.bucket_width
+        if bucket >= self.tree.size:
+            self._grow(bucket)
+        counts = self.buckets.setdefault(bucket, {})
+        counts[xp] = counts.get(xp, 0) + 1
+        self.tree.add(bucket, 1)
+    
+    def _remove(self, xp):
+        bucket = xp // self.bucket_width
+        counts = self.buckets[bucket]
+        if counts[xp] == 1:
+            del counts[xp]
+            if not counts:
+                del self.buckets[bucket]
+        else:
+            counts[xp] -= 1
+        self.tree.add(bucket, -1)
+    
+    def update(self, user_id, xp):
+        """Record a member's current XP"""
+        xp = max(0, xp)
+        old = self.members.get(user_id)
+        if old == xp:
+            return
+        if old is not None:
+            self._remove(old)
+        self._insert(xp)
+        self.members[user_id] = xp
+    
+    def discard(self, user_id):
+        """Stop tracking a member"""
+        old = self.members.pop(user_id, None)
+        if old is not None:
+            self._remove(old)
+    
+    def xp(self, user_id):
+        """Return a tracked member's XP, or None"""
+        return self.members.get(user_id)
+    
+    def count_above(self, xp):
+        """Number of tracked members with strictly more XP"""
+        bucket = xp // self.bucket_width
+        above = len(self.members) - self.tree.prefix(bucket)
+        for value, count in self.buckets.get(bucket, {}).items():
+            if value > xp:
+                above += count
+        return above
+    
+    def rank(self, user_id):
+        """Return the member's 1-based rank, or None if they are not tracked"""
+        xp = self.members.get(user_id)
+        if xp is None:
+            return None
+        return self.count_above(xp) + 1
+    
+    def percentile(self, user_id):
+        """Share of members the user is ahead of or tied with, from 0 to 100"""
+        rank = self.rank(user_id)
+        if rank is None:
+            return None
+        return 100.0 * (len(self.members) - rank + 1) / len(self.members)
+
+class RankIndex:
+    """Lazily built GuildRanking per guild, kept for the most active guilds"""
+    
+    def __init__(self, db, max_guilds=100, overlay=None):
+        self.db = db
+        self.max_guilds = max_guilds
+        self.overlay = overlay  # callable(guild_id) -> {user_id: xp} not yet written
+        self.guilds = OrderedDict()
+        self._loading = {}
+    
+    @property
+    def enabled(self):
+        """Whether in-memory rankings are in use"""
+        return self.max_guilds > 0
+    
+    async def get(self, guild_id):
+        """Return the guild's ranking, loading it if needed"""
+        ranking = self.guilds.get(guild_id)
+        if ranking is not None:
+            self.guilds.move_to_end(guild_id)
+            return ranking
+        
+        task = self._loading.get(guild_id)
+        if task is None:
+            task = asyncio.ensure_future(self._load(guild_id))
+            self._loading[guild_id] = task
+            task.add_done_callback(lambda _: self._loading.pop(guild_id, None))
+        return await asyncio.shield(task)
+    
+    async def _load(self, guild_id):
+        rows = await self.db.fetchall(
+            'SELECT user_id, xp FROM levels WHERE guild_id = ?',
+            (guild_id,)
+        )
+        
+        ranking = GuildRanking()
+        for user_id, xp in rows:
+            ranking.update(user_id, xp)
+        if self.overlay:
+            for user_id, xp in self.overlay(guild_id).items():
+                ranking.update(user_id, xp)
+        
+        self.guilds[guild_id] = ranking
+        while len(self.guilds) > self.max_guilds:
+            self.guilds.popitem(last=False)
+        return ranking
+    
+    def update(self, guild_id, user_id, xp):
+        """Apply an XP change to the guild's ranking if it is loaded"""
+        ranking = self.guilds.get(guild_id)
+        if ranking is not None:
+            ranking.update(user_id, xp)
+    
+    def invalidate(self, guild_id=None):
+        """Drop one guild's ranking, or all of them, so they reload on next use"""
+        if guild_id is None:
+            self.guilds.clear()
+        else:
+            self.guilds.pop(guild_id, None)
@@ -0,0 +1,142 @@
+import time
+from discord.ext import commands
+from utils.cooldowns import CooldownMap
+
+class TokenBucket:
+    """Classic token bucket allowing `rate` actions every `per` seconds"""
+    
+    __slots__ = ('capacity', 'fill_rate', 'tokens', 'updated')
+    
+    def __init__(self, rate, per):
+        self.capacity = float(rate)
+        self.fill_rate = rate / per
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+    
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+        self.updated = now
+    
+    def try_consume(self, amount=1):
+        """Take tokens if available; return True on success"""
+        self._refill(time.monotonic())
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+    
+    def reserve(self, amount=1):
+        """Take tokens now, possibly going into debt, and return how long to wait before acting"""
+        self._refill(time.monotonic())
+        self.tokens -= amount
+        return max(0.0, -self.tokens / self.fill_rate)
+    
+    def retry_after(self, amount=1):
+        """Seconds until `amount` tokens are available, without taking any"""
+        self._refill(time.monotonic())
+        return max(0.0, (amount - self.tokens) / self.fill_rate)
+    
+    def is_full(self):
+        """Whether the bucket has refilled completely (and can be forgotten)"""
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+class BucketMap:
+    """Token buckets keyed by any hashable"""
+    
+    def __init__(self, rate, per, sweep_interval=60.0):
+        self.rate = rate
+        self.per = per
+        self.sweep_interval = sweep_interval
+        self.buckets = {}
+        self._next_sweep = time.monotonic() + sweep_interval
+    
+    def __len__(self):
+        return len(self.buckets)
+    
+    def get(self, key):
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            # A full bucket behaves exactly like a new one, so it can be forgotten
+            self.buckets = {k: bucket for k, bucket in self.buckets.items() if not bucket.is_full()}
+            self._next_sweep = now + self.sweep_interval
+        
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(self.rate, self.per)
+        return bucket
+
+def parse_rate(spec):
+    """Parse a 'count/seconds' rate such as '5/10'"""
+    count, _, per = spec.partition('/')
+    return float(count), float(per or 1)
+
+def parse_limits(spec, parse=parse_rate):
+    """Parse 'name=value,name=value' into a dict, parsing each value with `parse`"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, value = item.partition('=')
+        limits[name.strip()] = parse(value.strip())
+    return limits
+
+class RateLimited(commands.CheckFailure):
+    """A command was refused by the CommandLimiter"""
+    
+    def __init__(self, scope, retry_after, notify):
+        self.scope = scope
+        self.retry_after = retry_after
+        self.notify = notify
+        super().__init__(f'Rate limited ({scope}), retry in {retry_after:.1f}s')
+
+class CommandLimiter:
+    """Central limits applied to every command before it runs"""
+    
+    def __init__(self, user_rate=(5, 10), guild_rate=(60, 10), command_rates=None, concurrency=None):
+        self.users = BucketMap(*user_rate)
+        self.guilds = BucketMap(*guild_rate)
+        self.commands = {name: BucketMap(*rate) for name, rate in (command_rates or {}).items()}
+        self.concurrency = concurrency or {}
+        self.active = {}
+        self.warned = CooldownMap()
+        self.refused = 0
+    
+    def check(self, ctx):
+        name = ctx.command.qualified_name
+        place = ctx.guild.id if ctx.guild else ctx.channel.id
+        scopes = [('user', self.users.get(ctx.author.id))]
+        if ctx.guild:
+            scopes.append(('guild', self.guilds.get(ctx.guild.id)))
+        if name in self.commands:
+            scopes.append((name, self.commands[name].get(place)))
+        
+        scope, wait = max(((scope, bucket.retry_after()) for scope, bucket in scopes), key=lambda item: item[1])
+        if wait > 0:
+            self.refused += 1
+            # Only tell each user once per wait, so the refusals don't become spam themselves
+            raise RateLimited(scope, wait, self.warned.try_acquire((ctx.author.id, scope), wait))
+        
+        for _, bucket in scopes:
+            bucket.try_consume()
+        return True
+    
+    def acquire(self, ctx):
+        cap = self.concurrency.get(ctx.command.qualified_name)
+        if cap is None:
+            return
+        key = (ctx.command.qualified_name, ctx.guild.id if ctx.guild else ctx.channel.id)
+        if self.active.get(key, 0) >= cap:
+            self.refused += 1
+            raise commands.MaxConcurrencyReached(cap, commands.BucketType.guild)
+        self.active[key] = self.active.get(key, 0) + 1
+        ctx.concurrency_key = key
+    
+    def release(self, ctx):
+        key = getattr(ctx, 'concurrency_key', None)
+        if key is None:
+            return
+        ctx.concurrency_key = None
+        remaining = self.active.get(key, 1) - 1
+        if remaining > 0:
+            self.active[key] = remaining
+        else:
+            self.active.pop(key, None)
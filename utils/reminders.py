@@ -0,0 +1,147 @@
+import asyncio
+import heapq
+import logging
+import time
+import discord
+from utils.cluster import owns_guild
+
+log = logging.getLogger(__name__)
+
+class ReminderScheduler:
+    """Durable reminders driven by one timer task"""
+    
+    def __init__(self, bot, batch_size=100, max_sleep=3600.0):
+        self.bot = bot
+        self.batch_size = batch_size
+        self.max_sleep = max_sleep
+        self.heap = []
+        self.pending = set()
+        self.delivered = 0
+        self._deliveries = set()
+        self._wakeup = asyncio.Event()
+        self._task = None
+    
+    def __len__(self):
+        return len(self.pending)
+    
+    async def load(self):
+        """Read every pending reminder's due time from the database"""
+        rows = await self.bot.db.fetchall('SELECT due_at, id, guild_id FROM reminders')
+        self.heap = [(due_at, reminder_id) for due_at, reminder_id, guild_id in rows if owns_guild(self.bot, guild_id)]
+        heapq.heapify(self.heap)
+        self.pending = {reminder_id for _, reminder_id in self.heap}
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+    
+    async def add(self, user_id, guild_id, channel_id, message, due_at):
+        """Store a reminder and schedule it; returns its ID"""
+        async with self.bot.db.transaction() as conn:
+            cursor = await conn.execute(
+                'INSERT INTO reminders (user_id, guild_id, channel_id, message, due_at, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (user_id, guild_id, channel_id, message, due_at, time.time())
+            )
+            reminder_id = cursor.lastrowid
+        
+        if not self.heap or due_at < self.heap[0][0]:
+            self._wakeup.set()
+        heapq.heappush(self.heap, (due_at, reminder_id))
+        self.pending.add(reminder_id)
+        return reminder_id
+    
+    async def cancel(self, user_id, reminder_id):
+        """Cancel one of a user's reminders; returns False if they have no such reminder"""
+        deleted = await self.bot.db.execute(
+            'DELETE FROM reminders WHERE id = ? AND user_id = ?',
+            (reminder_id, user_id)
+        )
+        if not deleted:
+            return False
+        
+        self.pending.discard(reminder_id)
+        # Cancelled entries are skipped when they come up; compact if they dominate the heap
+        if len(self.heap) > 1024 and len(self.heap) > 2 * len(self.pending):
+            self.heap = [entry for entry in self.heap if entry[1] in self.pending]
+            heapq.heapify(self.heap)
+        return True
+    
+    async def for_user(self, user_id, limit=10):
+        """A user's pending reminders as (id, channel_id, message, due_at), soonest first"""
+        return await self.bot.db.fetchall(
+            'SELECT id, channel_id, message, due_at FROM reminders WHERE user_id = ? ORDER BY due_at LIMIT ?',
+            (user_id, limit)
+        )
+    
+    async def count_for_user(self, user_id):
+        return await self.bot.db.fetchval('SELECT COUNT(*) FROM reminders WHERE user_id = ?', (user_id,), default=0)
+    
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        while True:
+            while self.heap and self.heap[0][1] not in self.pending:
+                heapq.heappop(self.heap)
+            
+            delay = self.max_sleep if not self.heap else min(self.max_sleep, self.heap[0][0] - time.time())
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            try:
+                await self._fire_due()
+            except Exception as e:
+                log.exception('Failed to deliver reminders: %s', e)
+                await asyncio.sleep(5)
+    
+    async def _fire_due(self):
+        now = time.time()
+        due = []
+        while self.heap and self.heap[0][0] <= now and len(due) < self.batch_size:
+            _, reminder_id = heapq.heappop(self.heap)
+            if reminder_id in self.pending:
+                due.append(reminder_id)
+        if not due:
+            return
+        
+        placeholders = ','.join('?' * len(due))
+        rows = await self.bot.db.fetchall(
+            f'SELECT id, user_id, channel_id, message, due_at FROM reminders WHERE id IN ({placeholders})',
+            due
+        )
+        await self.bot.db.execute(f'DELETE FROM reminders WHERE id IN ({placeholders})', due)
+        self.pending.difference_update(due)
+        
+        # Deliver in the background so a slow channel never holds up later reminders
+        task = asyncio.create_task(self._deliver_batch(rows, now))
+        self._deliveries.add(task)
+        task.add_done_callback(self._deliveries.discard)
+    
+    async def _deliver_batch(self, rows, now):
+        await asyncio.gather(*(self._deliver(*row, now) for row in rows))
+    
+    async def _deliver(self, reminder_id, user_id, channel_id, message, due_at, now):
+        embed = discord.Embed(
+            title="⏰ Reminder!",
+            description=message,
+            color=discord.Color.red()
+        )
+        if now - due_at > 60:
+            embed.set_footer(text="Delivered late because the bot was offline")
+        
+        # A partial channel can be sent to without it being cached
+        channel = self.bot.get_channel(channel_id) or self.bot.get_partial_messageable(channel_id)
+        try:
+            await self.bot.outbox.send(channel, content=f"<@{user_id}>", embed=embed)
+            self.delivered += 1
+        except discord.HTTPException as e:
+            log.warning('Failed to deliver reminder %s to channel %s: %s', reminder_id, channel_id, e)
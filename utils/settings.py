@@ -0,0 +1,47 @@
+COLUMNS = ('prefix', 'welcome_channel_id', 'welcome_message', 'leave_message', 'autorole_id')
+
+class GuildSettingsCache:
+    """Write-through cache of the guild_settings table"""
+    
+    def __init__(self, db, default_prefix):
+        self.db = db
+        self.default_prefix = default_prefix
+        self.guilds = {}
+    
+    async def load(self):
+        """Load every guild's settings"""
+        rows = await self.db.fetchall(f"SELECT guild_id, {', '.join(COLUMNS)} FROM guild_settings")
+        self.guilds = {row[0]: dict(zip(COLUMNS, row[1:])) for row in rows}
+    
+    def get(self, guild_id):
+        """Return the guild's settings as a dict, or None if it has none"""
+        return self.guilds.get(guild_id)
+    
+    def value(self, guild_id, column, default=None):
+        """Return a single setting for the guild"""
+        settings = self.guilds.get(guild_id)
+        if settings is None or settings[column] is None:
+            return default
+        return settings[column]
+    
+    def prefix(self, guild_id):
+        """Return the guild's command prefix, falling back to the default"""
+        return self.value(guild_id, 'prefix', self.default_prefix)
+    
+    async def update(self, guild_id, **values):
+        """Write the given columns for a guild and update the cache"""
+        for column in values:
+            if column not in COLUMNS:
+                raise ValueError(f'Unknown guild setting: {column}')
+        
+        columns = ', '.join(values)
+        placeholders = ', '.join('?' for _ in values)
+        assignments = ', '.join(f'{column} = excluded.{column}' for column in values)
+        await self.db.execute(
+            f'INSERT INTO guild_settings (guild_id, {columns}) VALUES (?, {placeholders}) '
+            f'ON CONFLICT (guild_id) DO UPDATE SET {assignments}',
+            (guild_id, *values.values())
+        )
+        
+        settings = self.guilds.setdefault(guild_id, dict.fromkeys(COLUMNS))
+        settings.update(values)
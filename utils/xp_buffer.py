@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import time
+from utils.leveling import level_sql
+
+log = logging.getLogger(__name__)
+
+FLUSH_SQL = f'''
+    INSERT INTO levels (user_id, guild_id, xp, level) VALUES (?, ?, ?, ?)
+    ON CONFLICT (user_id, guild_id)
+    DO UPDATE SET xp = levels.xp + excluded.xp, level = {level_sql("levels.xp + excluded.xp")}
+'''
+
+class XPBuffer:
+    """Write-behind accumulator for message XP"""
+    
+    def __init__(self, db, level_func, flush_interval=10.0, max_pending=500, idle_ttl=600.0):
+        self.db = db
+        self.level_func = level_func
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.idle_ttl = idle_ttl
+        
+        self.pending = {}   # (user_id, guild_id) -> XP gained since last flush
+        self.totals = {}    # (user_id, guild_id) -> [xp, level, last_touched]
+        self.on_update = None  # optional callable(guild_id, user_id, xp) after every change
+        self.on_write = None   # optional callable(guild_ids) after XP for those guilds reaches the database
+        self.generations = {}  # guild_id -> bulk writes so far, so loads that raced one can be spotted
+        
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._flush_now = asyncio.Event()
+    
+    async def start(self):
+        """Start the flush loop"""
+        self._task = asyncio.create_task(self._run())
+    
+    async def close(self):
+        """Stop the flush loop and write out anything still pending"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        await self.flush()
+    
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            
+            try:
+                await self.flush()
+            except Exception as e:
+                log.exception('XP flush failed: %s', e)
+    
+    async def _load(self, key):
+        """Fetch the stored totals for a key the buffer has not seen yet"""
+        row = await self.db.fetchone(
+            'SELECT xp, level FROM levels WHERE user_id = ? AND guild_id = ?',
+            key
+        )
+        return row or (0, 0)
+    
+    async def add(self, user_id, guild_id, amount):
+        """Buffer an XP gain and return (old_level, new_level) for the member"""
+        key = (user_id, guild_id)
+        entry = self.totals.get(key)
+        
+        while entry is None:
+            generation = self.generations.get(guild_id, 0)
+            xp, level = await self._load(key)
+            # Another message may have been buffered while loading; if a bulk write
+            # landed instead, the row read may predate it, so load it again
+            entry = self.totals.get(key)
+            if entry is None and self.generations.get(guild_id, 0) == generation:
+                entry = self.totals[key] = [xp, level, 0.0]
+        
+        old_level = entry[1]
+        entry[0] += amount
+        entry[1] = self.level_func(entry[0])
+        entry[2] = time.monotonic()
+        
+        self.pending[key] = self.pending.get(key, 0) + amount
+        if self.on_update:
+            self.on_update(guild_id, user_id, entry[0])
+        
+        if len(self.pending) >= self.max_pending:
+            self._flush_now.set()
+        
+        return old_level, entry[1]
+    
+    def get(self, user_id, guild_id):
+        """Return the buffered (xp, level) for a member, or None if not tracked"""
+        entry = self.totals.get((user_id, guild_id))
+        return (entry[0], entry[1]) if entry else None
+    
+    def guild_totals(self, guild_id):
+        """Return {user_id: xp} for every buffered member of a guild"""
+        return {key[0]: entry[0] for key, entry in self.totals.items() if key[1] == guild_id}
+    
+    async def flush(self):
+        """Write all pending gains in a single transaction"""
+        async with self._lock:
+            await self._flush_locked()
+    
+    async def _flush_locked(self):
+        if not self.pending:
+            self._evict_idle()
+            return
+        
+        batch, self.pending = self.pending, {}
+        rows = [(key[0], key[1], gained, self.level_func(gained)) for key, gained in batch.items()]
+        
+        try:
+            # The level of existing rows is recomputed from the stored XP, so it stays
+            # right even if a bulk update changed the row after we cached its totals
+            await self.db.executemany(FLUSH_SQL, rows)
+        except Exception:
+            # Put the batch back so the gains are retried on the next flush
+            for key, gained in batch.items():
+                self.pending[key] = self.pending.get(key, 0) + gained
+            raise
+        
+        if self.on_write:
+            self.on_write({key[1] for key in batch})
+        self._evict_idle()
+    
+    async def adjust(self, user_id, guild_id, amount):
+        """Apply a manual XP change on top of pending gains and return the new (xp, level)"""
+        key = (user_id, guild_id)
+        async with self._lock:
+            await self._flush_locked()
+            
+            xp, _ = await self._load(key)
+            new_xp = max(0, xp + amount)
+            new_level = self.level_func(new_xp)
+            
+            await self.db.execute(
+                '''
+                INSERT INTO levels (user_id, guild_id, xp, level) VALUES (?, ?, ?, ?)
+                ON CONFLICT (user_id, guild_id)
+                DO UPDATE SET xp = excluded.xp, level = excluded.level
+                ''',
+                (user_id, guild_id, new_xp, new_level)
+            )
+            
+            # Gains buffered while we were writing still apply on top
+            buffered_xp = new_xp + self.pending.get(key, 0)
+            self.totals[key] = [buffered_xp, self.level_func(buffered_xp), time.monotonic()]
+            if self.on_update:
+                self.on_update(guild_id, user_id, buffered_xp)
+            if self.on_write:
+                self.on_write({guild_id})
+        
+        return new_xp, new_level
+    
+    async def bulk_add(self, guild_id, amount, user_ids=None, chunk_size=500):
+        """Add XP to many members of a guild with set-based SQL and return how many were affected"""
+        async with self._lock:
+            await self._flush_locked()
+            
+            if user_ids is None:
+                async with self.db.transaction() as conn:
+                    async with conn.execute(
+                        'UPDATE levels SET xp = MAX(0, xp + ?) WHERE guild_id = ?',
+                        (amount, guild_id)
+                    ) as cursor:
+                        affected = cursor.rowcount
+                    await conn.execute(
+                        f'UPDATE levels SET level = {level_sql()} WHERE guild_id = ?',
+                        (guild_id,)
+                    )
+            else:
+                user_ids = list(dict.fromkeys(user_ids))
+                affected = len(user_ids)
+                for start in range(0, len(user_ids), chunk_size):
+                    chunk = user_ids[start:start + chunk_size]
+                    async with self.db.transaction() as conn:
+                        await conn.executemany(
+                            '''
+                            INSERT INTO levels (user_id, guild_id, xp, level) VALUES (?, ?, MAX(0, ?), 0)
+                            ON CONFLICT (user_id, guild_id) DO UPDATE SET xp = MAX(0, levels.xp + excluded.xp)
+                            ''',
+                            [(user_id, guild_id, amount) for user_id in chunk]
+                        )
+                        await conn.execute('CREATE TEMP TABLE IF NOT EXISTS bulk_users (user_id INTEGER PRIMARY KEY)')
+                        await conn.execute('DELETE FROM bulk_users')
+                        await conn.executemany(
+                            'INSERT OR IGNORE INTO bulk_users (user_id) VALUES (?)',
+                            [(user_id,) for user_id in chunk]
+                        )
+                        await conn.execute(
+                            f'UPDATE levels SET level = {level_sql()} '
+                            'WHERE guild_id = ? AND user_id IN (SELECT user_id FROM bulk_users)',
+                            (guild_id,)
+                        )
+            
+            self._refresh_guild(guild_id, lambda xp: max(0, xp + amount), user_ids)
+        
+        return affected
+    
+    async def reset_guild(self, guild_id):
+        """Delete every member's XP in a guild and return how many were removed"""
+        async with self._lock:
+            await self._flush_locked()
+            affected = await self.db.execute('DELETE FROM levels WHERE guild_id = ?', (guild_id,))
+            self._refresh_guild(guild_id, lambda xp: 0)
+        return affected
+    
+    def _refresh_guild(self, guild_id, change, user_ids=None):
+        """Bring cached totals in line after a bulk write to a guild"""
+        self.generations[guild_id] = self.generations.get(guild_id, 0) + 1
+        targets = None if user_ids is None else set(user_ids)
+        for key in [key for key in self.totals if key[1] == guild_id]:
+            if targets is not None and key[0] not in targets:
+                continue
+            if key in self.pending:
+                entry = self.totals[key]
+                entry[0] = change(entry[0] - self.pending[key]) + self.pending[key]
+                entry[1] = self.level_func(entry[0])
+            else:
+                del self.totals[key]
+    
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_ttl
+        stale = [key for key, entry in self.totals.items()
+                 if entry[2] < cutoff and key not in self.pending]
+        for key in stale:
+            del self.totals[key]